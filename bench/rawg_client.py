@@ -0,0 +1,105 @@
+"""Runs RAWGClient against a local stub of the RAWG API, and compares it with a new session per request.
+
+The stub is plain HTTP on localhost, so the gap understates the savings against api.rawg.io, where every new
+connection also pays for DNS, TCP and TLS over the network.
+
+Usage: python bench/rawg_client.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.rawg import RAWGClient, RAWGError # noqa: E402
+
+GAME = {"slug": "portal-2", "name": "Portal 2", "released": "2011-04-18", "platforms": [], "genres": [], "rating": 4.6, "metacritic": 95}
+
+
+class StubRAWG:
+    """A stub of the RAWG endpoints the bot uses, counting connections and concurrent requests"""
+    def __init__(self, delay: float = 0.005):
+        self.delay = delay
+        self.peers = set() # Client (host, port) pairs, one per TCP connection
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.app = web.Application()
+        self.app.router.add_get("/api/games", self.search)
+        self.app.router.add_get("/api/games/{slug}", self.details)
+
+    async def _serve(self, request: web.Request, payload: dict) -> web.Response:
+        self.peers.add(request.transport.get_extra_info("peername"))
+        if request.query.get("key") != "test-key":
+            return web.json_response({"error": "bad key"}, status=401)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return web.json_response(payload)
+
+    async def search(self, request: web.Request) -> web.Response:
+        return await self._serve(request, {"results": [GAME]})
+
+    async def details(self, request: web.Request) -> web.Response:
+        if request.match_info["slug"] == "missing":
+            return web.json_response({"detail": "Not found."}, status=404)
+        return await self._serve(request, {**GAME, "description": "<p>Puzzles</p>", "developers": [], "publishers": []})
+
+
+async def main(requests: int):
+    stub = StubRAWG()
+    runner = web.AppRunner(stub.app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/api"
+
+    try:
+        # Correctness against the stub
+        client = RAWGClient("test-key", base_url=base_url, max_concurrency=4)
+        assert (await client.search_games("portal"))[0]["slug"] == "portal-2"
+        assert (await client.get_game("portal-2"))["description"] == "<p>Puzzles</p>"
+        try:
+            await client.get_game("missing")
+            raise AssertionError("expected a RAWGError for a 404")
+        except RAWGError as e:
+            assert e.status == 404
+        assert client.errors == 1
+
+        # Pooled session: sequential requests reuse one keep-alive connection, concurrent ones are capped
+        stub.peers.clear()
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.search_games("portal")
+        pooled = time.perf_counter() - start
+        assert len(stub.peers) == 1, f"expected one reused connection, got {len(stub.peers)}"
+
+        await asyncio.gather(*(client.get_game("portal-2") for _ in range(20)))
+        assert stub.max_in_flight <= 4, f"concurrency cap exceeded: {stub.max_in_flight}"
+        stats = client.stats()
+        await client.close()
+
+        # The old behaviour: a new session, and so a new connection, for every request
+        stub.peers.clear()
+        start = time.perf_counter()
+        for _ in range(requests):
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"{base_url}/games", params={"search": "portal", "key": "test-key"}) as response:
+                    await response.json()
+        per_request = time.perf_counter() - start
+
+        print(f"{requests} sequential requests against the stub:")
+        print(f"  pooled client:       {pooled * 1000:8.1f}ms total, {pooled / requests * 1000:.2f}ms each, 1 connection")
+        print(f"  session per request: {per_request * 1000:8.1f}ms total, {per_request / requests * 1000:.2f}ms each, {len(stub.peers)} connections")
+        print(f"  client latency: {stats['count']} requests, avg {stats['avg_ms']:.2f}ms, {stats['errors']} errors; max in flight {stub.max_in_flight}")
+        print("OK")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,111 @@
+"""Benchmarks parse_time_format against the strptime loop it replaced, and checks they agree.
+
+The corpus is typical /reminder remindme input (absolute formats, relative times that fall through to
+dateparser, and invalid dates), plus random inputs for the agreement check only.
+
+Usage: python bench/time_formats.py [random inputs]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from itertools import product
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.time_formats import parse_time_format # noqa: E402
+
+CORPUS = [
+    "9 PM", "9pm", "9:30 PM", "9:30pm", "21:30", "12 AM", "12am", "0:05", "2025-07-20", "2025/7/20", "2025 07 20", "2025-Jul-20",
+    "2025 July 20", "2025-07", "2025 Jul", "2025 july", "20-7", "20/07", "20 07", "20-7 10 AM", "20/07/2025", "20 Jul 2025",
+    "20 july 2025 9:00 PM", "Wednesday", "wed", "Monday 9:30 PM", "fri 5pm", "07-25", "Jul 25", "july 25 8 am", "January-5",
+    "3 days", "5 hours 30 min", "tomorrow at 5 pm", "next friday", "in 2 hours", "31-02", "29-02", "30/2", "13:61", "25:00",
+    "0 AM", "13 PM", "2025-13-01", "2025-02-30", "1-1", "01/01 00:00", "2025-07-20 9:00 PM", "2025-07-20 21:00", " 9 PM",
+    "9 PM ", "9  PM", "9\tPM", "12/31/2025", "2025.07.20", "sept 5", "Tues", "thurs 9 pm", "may 5", "5 may", "may",
+    "2025 may 5 5:05pm", "1 2", "1 2 3", "10 11 2025", "2025 1", "0000-01-01", "1999-12-31 11:59 PM", "Mon 0:00",
+    "01- 9", " 9-01", "2025-01- 9", "jul/ 4 9 pm", "12: 5",
+]
+
+
+def get_datetime_format(remind_at: str):
+    """The strptime loop parse_time_format replaced, from cogs/reminder.py before it moved to utils/time_formats.py"""
+    date_formats = [
+        # Year first
+        "%Y-%m-%d", "%Y/%m/%d", "%Y %m %d", # 2025-01-25, 2025/01/25, 2025 01 25
+        "%Y-%b-%d", "%Y/%b/%d", "%Y %b %d", # 2025-Jan-25, 2025/Jan/25, 2025 Jan 25
+        "%Y-%B-%d", "%Y/%B/%d", "%Y %B %d", # 2025-January-25, 2025/January/25, 2025 January 25
+        "%Y-%m", "%Y/%m", "%Y %m", # 2025-01, 2025/01, 2025 01
+        "%Y-%b", "%Y/%b", "%Y %b", # 2025-Jan, 2025/Jan, 2025 Jan
+        "%Y-%B", "%Y/%B", "%Y %B", # 2025-January, 2025/January, 2025 January
+        # Day first
+        "%d-%m-%Y", "%d/%m/%Y", "%d %m %Y", # 25-01-2025, 25/01/2025, 25 01 2025
+        "%d-%b-%Y", "%d/%b/%Y", "%d %b %Y", # 25-Jan-2025, 25/Jan/2025, 25 Jan 2025
+        "%d-%B-%Y", "%d/%B/%Y", "%d %B %Y", # 25-January-2025, 25/January/2025, 25 January 2025
+        "%d-%m", "%d/%m", "%d %m", # 25-01, 25/01, 25 01
+        "%d-%b", "%d/%b", "%d %b", # 25-Jan, 25/Jan, 25 Jan
+        "%d-%B", "%d/%B", "%d %B", # 25-January, 25/January, 25 January
+        "%a", "%A", # Wed, Wednesday
+        # Month first
+        "%m-%d", "%m/%d", "%m %d", # 01-25, 01/25, 01 25
+        "%b-%d", "%b/%d", "%b %d", # Jan-25, Jan/25, Jan 25
+        "%B-%d", "%B/%d", "%B %d", # January-25, January/25, January 25
+    ]
+    time_formats = [
+        "%I:%M %p", # 12:00 PM
+        "%I:%M%p", # 12:00PM
+        "%H:%M", # 12:00
+        "%I %p", # 12 PM
+        "%I%p" # 12PM
+    ]
+    # Combined format for both date and time format lists
+    combined_formats = [f"{date} {time}" for date, time in product(date_formats, time_formats)]
+    valid_formats = combined_formats + date_formats + time_formats
+    
+    for frmt in valid_formats: 
+        try:
+            # Try to parse the remind_at string with the current format
+            datetime.strptime(remind_at, frmt) 
+            return frmt
+
+        except ValueError:
+            continue
+    return None
+
+
+def random_input(rng: random.Random) -> str:
+    parts = [rng.choice(["2025", "7", "07", "25", "31", "12", "jul", "july", "wed", "monday", "pm", "am", "9", "30", "0", "13", "2024", "feb", "29"])
+             for _ in range(rng.randint(1, 5))]
+    separators = [rng.choice([" ", "-", "/", ":", "", "- ", "/ "]) for _ in parts]
+    return rng.choice(["", " "]) + "".join(part + separator for part, separator in zip(parts, separators)).rstrip()
+
+
+def agrees(text: str) -> bool:
+    """Whether both parsers accept the input with the same format and fields, or both reject it"""
+    fmt, parsed = get_datetime_format(text), parse_time_format(text)
+    if fmt is None:
+        # Known difference: Feb 29 without a year, which strptime rejects because it assumes 1900
+        return parsed is None or (parsed.month, parsed.day, parsed.year) == (2, 29, None)
+    expected = datetime.strptime(text, fmt)
+    return parsed is not None and parsed.format == fmt and (parsed.year or 1900, parsed.month or 1, parsed.day or 1, parsed.hour, parsed.minute) == (
+        expected.year, expected.month, expected.day, expected.hour, expected.minute)
+
+
+def per_input(func, inputs: list, rounds: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in inputs:
+            func(text)
+    return (time.perf_counter() - start) / (rounds * len(inputs))
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    inputs = CORPUS + [random_input(rng) for _ in range(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)]
+    mismatches = [text for text in inputs if not agrees(text)]
+    for text in mismatches[:20]:
+        print(f"MISMATCH {text!r}: strptime {get_datetime_format(text)}, parser {parse_time_format(text)}")
+    print(f"{len(inputs) - len(mismatches)}/{len(inputs)} inputs agree")
+
+    old, new = per_input(get_datetime_format, CORPUS), per_input(parse_time_format, CORPUS)
+    print(f"{len(CORPUS)} corpus inputs: strptime loop {old * 1e6:.1f}us/input, parse_time_format {new * 1e6:.2f}us/input ({old / new:.0f}x)")
+    sys.exit(1 if mismatches else 0)
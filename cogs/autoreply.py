@@ -1,8 +1,45 @@
 import discord
-import aiosqlite
 import logging
 from discord.ext import commands
 from discord import app_commands
+from utils.cache import LRUCache
+from utils.matcher import AhoCorasick
+
+
+class GuildAutoReplies:
+    """The autoreplies of a guild with a compiled matcher over their triggers"""
+    def __init__(self, rows):
+        self.replies = dict(rows) # Trigger -> response, in the order they were added
+        self._triggers = []
+        self._matcher = None # Compiled lazily and dropped when the set of triggers changes
+
+    def set(self, trigger: str, response: str):
+        """Adds or updates an autoreply"""
+        if trigger not in self.replies:
+            self._matcher = None # A new trigger needs the matcher to be recompiled
+        self.replies[trigger] = response
+
+    def remove(self, trigger: str):
+        """Removes an autoreply"""
+        if self.replies.pop(trigger, None) is not None:
+            self._matcher = None
+
+    def clear(self):
+        """Removes all autoreplies"""
+        self.replies.clear()
+        self._matcher = None
+
+    def match(self, content: str) -> list[str]:
+        """Returns the responses of every trigger found in the message content"""
+        if not self.replies:
+            return []
+
+        if self._matcher is None:
+            self._triggers = list(self.replies)
+            self._matcher = AhoCorasick(trigger.lower() for trigger in self._triggers)
+
+        found = self._matcher.search(content.lower())
+        return [self.replies[self._triggers[index]] for index in sorted(found)]
 
 
 @app_commands.guild_only()
@@ -12,23 +49,54 @@ class AutoReply(commands.GroupCog, name="autoreply"):
     def __init__(self, bot: commands.Bot):
         # Initialize the cog with the bot instance
         self.bot = bot
+        self.guild_replies = LRUCache(max_size=5000) # Guild ID -> GuildAutoReplies
+        # Guild ID -> whether its autoreplies changed while they were being loaded, for the loads in progress
+        self._loading = {}
+
+    async def get_guild_replies(self, guild_id: int) -> GuildAutoReplies:
+        """Gets the autoreplies of a guild, loading them from the database if they aren't cached"""
+        replies = self.guild_replies.get(guild_id)
+        if replies is None:
+            self._loading.setdefault(guild_id, False)
+            try:
+                rows = await self.bot.db.fetchall("SELECT trigger, response FROM autoreplies WHERE guild_id = ? ORDER BY rowid", (guild_id, ))
+            except BaseException:
+                self._loading.pop(guild_id, None)
+                raise
+            replies = GuildAutoReplies(rows)
+            # Don't cache the result if the autoreplies changed while the query ran (or another load of the guild
+            # already took the flag), it may miss that change; the next message loads them again
+            if not self._loading.pop(guild_id, True):
+                self.guild_replies.set(guild_id, replies)
+        return replies
 
-    # on message listener to check for autoreply triggers
+    async def replies_changed(self, guild_id: int):
+        """Called after a guild's autoreplies changed in the database and in its cached matcher"""
+        if guild_id in self._loading:
+            self._loading[guild_id] = True # A load in progress may have read the table before the change
+        await self.bot.invalidate_shared("autoreplies", guild_id)
+
+    async def cog_load(self):
+        self.bot.register_message_handler("message", self.on_guild_message)
+        self.bot.shared_caches["autoreplies"] = self.guild_replies # Let other processes of a cluster evict outdated guilds
+
+    async def cog_unload(self):
+        self.bot.unregister_message_handler("message", self.on_guild_message)
+        self.bot.shared_caches.pop("autoreplies", None)
+
+    # Message handler that checks guild messages for autoreply triggers
+    async def on_guild_message(self, message: discord.Message):  
+        # Check if the message content matches any of the guild's autoreply triggers
+        replies = await self.get_guild_replies(message.guild.id)
+        
+        for response in replies.match(message.content):
+            # If the trigger is found, send the corresponding response
+            await message.reply(response)
+
+    # Drop the autoreplies of guilds the bot has left from memory
     @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):  
-        # Ignore messages from bots or messages not sent in a guild
-        if message.author.bot or not message.guild:
-            return
-
-        # Check if the message content matches any autoreply triggers in the database
-        async with aiosqlite.connect("database.db") as db:
-            async with db.execute("SELECT trigger, response FROM autoreplies WHERE guild_id = ?", (message.guild.id, )) as cursor:
-                rows = await cursor.fetchall()
-            
-            for trigger, response in rows:
-                if trigger.lower() in message.content.lower():
-                    # If the trigger is found, send the corresponding response
-                    await message.reply(response)
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.guild_replies.pop(guild.id)
 
     #===========================
     # ADD NEW AUTOREPLY COMMAND 
@@ -41,20 +109,24 @@ class AutoReply(commands.GroupCog, name="autoreply"):
         if trigger[0] in "`~!@#$%^&*()_+-=\\|[]{}<>?,.;:'/\"":
             return await interaction.response.send_message("The trigger message can't begin with a special character.")
 
-        # Connect to the database and insert the new autoreply trigger and response
-        async with aiosqlite.connect('database.db') as db:
-            try:
-                await db.execute(
-                    "INSERT INTO autoreplies (guild_id, trigger, response) VALUES (?, ?, ?)",
-                    (interaction.guild.id, trigger, reply)
-                )
-                await db.commit()
+        # Insert the new autoreply trigger and response into the database
+        try:
+            await self.bot.db.execute(
+                "INSERT INTO autoreplies (guild_id, trigger, response) VALUES (?, ?, ?)",
+                (interaction.guild.id, trigger, reply)
+            )
 
-            except Exception as e:
-                logging.error(f"Error inserting autoreply into database: `{e}`")
-                return await interaction.response.send_message(f"Error adding autoreply")
-            
-            await interaction.response.send_message(f"✅ Added a new autoreply with trigger: `{trigger}`")
+        except Exception as e:
+            logging.error(f"Error inserting autoreply into database: `{e}`")
+            return await interaction.response.send_message(f"Error adding autoreply")
+        
+        # Update the guild's matcher if its autoreplies are loaded
+        replies = self.guild_replies.peek(interaction.guild.id)
+        if replies is not None:
+            replies.set(trigger, reply)
+        await self.replies_changed(interaction.guild.id)
+
+        await interaction.response.send_message(f"✅ Added a new autoreply with trigger: `{trigger}`")
     
     #==========================
     # UPDATE AUTOREPLY COMMAND
@@ -67,27 +139,26 @@ class AutoReply(commands.GroupCog, name="autoreply"):
         if trigger[0] in "`~!@#$%^&*()_+-=\\|[]{}<>?,.;:'/\"":
             return await interaction.response.send_message("The trigger message can't begin with a special character.")
 
-        # Connect to the database and check if the trigger specified exists
-        async with aiosqlite.connect('database.db') as db:
-            try:
-                cursor = await db.execute("SELECT * FROM autoreplies WHERE guild_id = ? AND trigger = ?", (interaction.guild.id, trigger))
-                result = await cursor.fetchone()
-                
-                if result is None:
-                    return await interaction.response.send_message("No such trigger was found.")
-
-                # If the trigger exists, update the response in the database
-                await db.execute(
-                    "REPLACE INTO autoreplies (guild_id, trigger, response) VALUES (?, ?, ?)",
-                    (interaction.guild.id, trigger, reply)
-                )
-                await db.commit()
+        # Update the response if the trigger specified exists
+        try:
+            updated = await self.bot.db.execute(
+                "UPDATE autoreplies SET response = ? WHERE guild_id = ? AND trigger = ?",
+                (reply, interaction.guild.id, trigger)
+            )
+            
+            if not updated:
+                return await interaction.response.send_message("No such trigger was found.")
 
-            except Exception as e:
-                logging.error(f"Error updating autoreply {trigger} for guild {interaction.guild.name}({interaction.guild_id}): `{e}`")   
-                return await interaction.response.send_message(f"Error updating autoreply")
+        except Exception as e:
+            logging.error(f"Error updating autoreply {trigger} for guild {interaction.guild.name}({interaction.guild_id}): `{e}`")   
+            return await interaction.response.send_message(f"Error updating autoreply")
 
-            await interaction.response.send_message(f"✅ Successfully updated the autoreply:\nTrigger: `{trigger}`\nNew reply: `{reply}`")
+        replies = self.guild_replies.peek(interaction.guild.id)
+        if replies is not None:
+            replies.set(trigger, reply)
+        await self.replies_changed(interaction.guild.id)
+
+        await interaction.response.send_message(f"✅ Successfully updated the autoreply:\nTrigger: `{trigger}`\nNew reply: `{reply}`")
 
     #==========================
     # REMOVE AUTOREPLY COMMAND
@@ -96,27 +167,26 @@ class AutoReply(commands.GroupCog, name="autoreply"):
     @app_commands.describe(trigger="The trigger message to be deleted")
     async def remove_reply(self, interaction: discord.Interaction, trigger: str):
         """Remove an existing autoreply trigger in this server"""
-        # Connect to the database and check if the trigger specified exists
-        async with aiosqlite.connect('database.db') as db:
-            try:
-                cursor = await db.execute("SELECT * FROM autoreplies WHERE guild_id = ? AND trigger = ?", (interaction.guild.id, trigger))
-                result = await cursor.fetchone()
-                
-                if result is None:
-                    return await interaction.response.send_message("No such trigger was found.")
-
-                # If the trigger exists, delete it from the database
-                await db.execute(
-                    "DELETE FROM autoreplies WHERE guild_id = ? AND trigger = ?",
-                    (interaction.guild.id, trigger)
-                )
-                await db.commit()
+        # Delete the trigger if it exists
+        try:
+            deleted = await self.bot.db.execute(
+                "DELETE FROM autoreplies WHERE guild_id = ? AND trigger = ?",
+                (interaction.guild.id, trigger)
+            )
+            
+            if not deleted:
+                return await interaction.response.send_message("No such trigger was found.")
+
+        except Exception as e:
+            logging.error(f"Error deleting autoreply {trigger} from guild {interaction.guild.name}({interaction.guild_id}): `{e}`") 
+            return await interaction.response.send_message(f"Error deleting autoreply")  
 
-            except Exception as e:
-                logging.error(f"Error deleting autoreply {trigger} from guild {interaction.guild.name}({interaction.guild_id}): `{e}`") 
-                return await interaction.response.send_message(f"Error deleting autoreply")  
+        replies = self.guild_replies.peek(interaction.guild.id)
+        if replies is not None:
+            replies.remove(trigger)
+        await self.replies_changed(interaction.guild.id)
 
-            await interaction.response.send_message(f"✅ Successfully removed the autoreply for trigger: `{trigger}`")
+        await interaction.response.send_message(f"✅ Successfully removed the autoreply for trigger: `{trigger}`")
 
     #===============================
     # CLEAR ALL AUTOREPLIES COMMAND
@@ -124,24 +194,23 @@ class AutoReply(commands.GroupCog, name="autoreply"):
     @app_commands.command(name="clear")
     async def clear_reply(self, interaction: discord.Interaction):
         """Clear all autoreplies in this server"""
-        # Connect to the database and check if there are any autoreplies set for the server
-        async with aiosqlite.connect('database.db') as db:
-            try:
-                cursor = await db.execute("SELECT 1 FROM autoreplies WHERE guild_id = ? LIMIT 1", (interaction.guild.id, ))
-                result = await cursor.fetchone()
-                
-                if result is None:
-                    return await interaction.response.send_message("No autoreplies were found to clear.")
+        # Delete all autoreplies set for the server, if there are any
+        try:
+            deleted = await self.bot.db.execute("DELETE FROM autoreplies WHERE guild_id = ?", (interaction.guild.id, ))
+            
+            if not deleted:
+                return await interaction.response.send_message("No autoreplies were found to clear.")
 
-                # If autoreplies are found, delete all of them from the server
-                await db.execute("DELETE FROM autoreplies WHERE guild_id = ?", (interaction.guild.id, ))
-                await db.commit()
+        except Exception as e:
+            logging.error(f"Error clearing autoreplies for guild {interaction.guild.name}({interaction.guild_id}): `{e}`")  
+            return await interaction.response.send_message(f"Error clearing autoreplies`")  
 
-            except Exception as e:
-                logging.error(f"Error clearing autoreplies for guild {interaction.guild.name}({interaction.guild_id}): `{e}`")  
-                return await interaction.response.send_message(f"Error clearing autoreplies`")  
+        replies = self.guild_replies.peek(interaction.guild.id)
+        if replies is not None:
+            replies.clear()
+        await self.replies_changed(interaction.guild.id)
 
-            await interaction.response.send_message("✅ Successfully cleared all autoreplies for this server.")
+        await interaction.response.send_message("✅ Successfully cleared all autoreplies for this server.")
     
     #==========================
     # LIST AUTOREPLIES COMMAND
@@ -152,9 +221,7 @@ class AutoReply(commands.GroupCog, name="autoreply"):
         # Get all autoreplies set for the server from the database
         await interaction.response.defer()
         try:
-            async with aiosqlite.connect('database.db') as db:
-                async with db.execute("SELECT trigger, response FROM autoreplies WHERE guild_id = ?", (interaction.guild.id,)) as cursor:
-                    rows = await cursor.fetchall()
+            rows = await self.bot.db.fetchall("SELECT trigger, response FROM autoreplies WHERE guild_id = ?", (interaction.guild.id,))
 
         except Exception as e:
             logging.error(f"Error fetching autoreplies: {e}")
@@ -188,17 +255,7 @@ class AutoReply(commands.GroupCog, name="autoreply"):
         await interaction.followup.send(content=f"**Autoreplies in this server:**\n\n{msg}")
 
 
-# Registers the cog with the bot and creates the database table if it doesn't exist
+# Registers the cog with the bot (the table is created by the migrations in utils/migrations.py)
 async def setup(bot: commands.Bot):
     """Registers the cog with the bot"""
-    async with aiosqlite.connect('database.db') as db:
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS autoreplies (
-            guild_id INTEGER NOT NULL,
-            trigger TEXT NOT NULL,
-            response TEXT NOT NULL,
-            PRIMARY KEY (guild_id, trigger)
-        )""")
-        await db.commit()
-
     await bot.add_cog(AutoReply(bot))
\ No newline at end of file
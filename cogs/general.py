@@ -1,10 +1,12 @@
 import discord
 import logging
+from collections import Counter
 from random import choice as random_choice
 from discord import app_commands
 from discord.ext import commands
 from typing import Optional
 from config import kys_gif_list
+from utils.roles import ADMINISTRATOR, member_role_ids
 
 #==============================
 # FUNCTION FOR USER INFO EMBED
@@ -20,53 +22,33 @@ async def generate_user_info_embed(ctx_or_interaction, member: discord.Member, b
     embed.add_field(name="Joined", value=discord.utils.format_dt(member.joined_at, "D"), inline=True)
     embed.add_field(name="Registered", value=discord.utils.format_dt(member.created_at, "D"), inline=True)
 
+    guild = ctx_or_interaction.guild
+    role_index = bot.role_indexes.get(guild) # Precomputed role order and permissions of the guild
     try:
-        if member.roles:
-            roles_count = 0
-            for role in member.roles:
-                if role != ctx_or_interaction.guild.default_role: # Exclude the default @everyone role
-                    roles_count += 1
-            sorted_roles = sorted(member.roles, key=lambda role: role.position, reverse=True) # Sort roles by position from top to bottom
-            embed.add_field(name=f"Roles [{roles_count}]", value=", ".join(role.mention for role in sorted_roles if role != ctx_or_interaction.guild.default_role), inline=False)
+        role_ids = role_index.sorted_roles(member_role_ids(member)) # Sorted from top to bottom, without the default @everyone role
+        if role_ids:
+            embed.add_field(name=f"Roles [{len(role_ids)}]", value=", ".join(f"<@&{role_id}>" for role_id in role_ids), inline=False)
 
     except Exception as e:
-        logging.error(f"Error fetching roles for {member.name}({member.id}) in {ctx_or_interaction.guild.name}({ctx_or_interaction.guild.id}): {e}")    
+        logging.error(f"Error fetching roles for {member.name}({member.id}) in {guild.name}({guild.id}): {e}")    
         
-    mod_perms = (
-        "administrator",
-        "ban_members",
-        "kick_members",
-        "manage_guild",
-        "manage_channels",
-        "manage_roles",
-        "manage_messages",
-        "manage_webhooks",
-        "view_audit_log",
-        "manage_events",
-        "manage_threads",
-        "moderate_members",
-        "manage_nicknames",
-        "mention_everyone",
-        "mute_members",
-        "deafen_members",
-        "move_members",
-        "manage_emojis_and_stickers",
-        )
     # Check if the member has any of the moderator permissions
+    permissions = 0
     try:
-        enabled_mod_perms = [perm.replace("_", " ").title() for perm in mod_perms if getattr(member.guild_permissions, perm)]
-        if member.guild_permissions.administrator or enabled_mod_perms:
+        permissions = role_index.permissions_for(member)
+        enabled_mod_perms = role_index.mod_permissions(permissions)
+        if enabled_mod_perms:
             embed.add_field(name="Key Permissions",
                             value=", ".join(enabled_mod_perms),
                             inline=False) # Get all permissions that are set to True
     except Exception as e:
-        logging.error(f"Error fetching permissions for {member.name}({member.id}) in {ctx_or_interaction.guild.name}({ctx_or_interaction.guild.id}): {e}") 
+        logging.error(f"Error fetching permissions for {member.name}({member.id}) in {guild.name}({guild.id}): {e}") 
 
-    if member.guild_permissions.administrator:
-        embed.add_field(name="Acknowledgements", value=f"{'Server Owner' if member.id == ctx_or_interaction.guild.owner_id else 'Server Admin'}", inline=False)
+    if permissions & ADMINISTRATOR:
+        embed.add_field(name="Acknowledgements", value=f"{'Server Owner' if member.id == guild.owner_id else 'Server Admin'}", inline=False)
 
     embed.set_footer(text=f"ID: {member.id}")
-    user = await bot.fetch_user(member.id) # Fetch the user object from the API to access the banner
+    user = await bot.profiles.fetch(member.id) # Get the full user object (cached) to access the banner
 
     if user.banner:
         embed.set_image(url=user.banner.url)
@@ -81,6 +63,25 @@ class General(commands.Cog):
     # Initialize the cog with the bot instance
         self.bot = bot
 
+    # Drop the precomputed role index of a guild whenever its roles change, it is rebuilt on the next lookup
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.bot.role_indexes.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.bot.role_indexes.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        # Only the position and permissions are indexed
+        if before.position != after.position or before.permissions != after.permissions:
+            self.bot.role_indexes.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.bot.role_indexes.invalidate(guild.id)
+
     #==============
     # PING COMMAND 
     #==============
@@ -89,7 +90,17 @@ class General(commands.Cog):
         """Sends the bot's latency (ping) in milliseconds"""
         msg = await ctx.reply("Ping...", ephemeral=True) 
         ping = round(self.bot.latency * 1000) # Convert to ms
-        await msg.edit(content=f"🏓 Pong! {ping}ms")   
+        content = f"🏓 Pong! {ping}ms"
+        latencies = getattr(self.bot, "latencies", [])
+        if len(latencies) > 1:
+            # Show each shard's latency and guild count, marking the shard of this guild
+            guild_counts = Counter(guild.shard_id for guild in self.bot.guilds)
+            current = ctx.guild.shard_id if ctx.guild else None
+            content += "\n" + "\n".join(
+                f"{'**' if shard_id == current else ''}Shard {shard_id}: {round(latency * 1000)}ms, {guild_counts[shard_id]} guilds{'**' if shard_id == current else ''}"
+                for shard_id, latency in latencies
+            )
+        await msg.edit(content=content)   
 
     #=============
     # SAY COMMAND 
@@ -254,7 +265,7 @@ class General(commands.Cog):
         await ctx.defer()
         member = member or ctx.author
         try:
-            user = await self.bot.fetch_user(member.id) # Fetch the user object from the API to access the banner
+            user = await self.bot.profiles.fetch(member.id) # Get the full user object (cached) to access the banner
 
             if not user.banner:
                 return await ctx.reply("That member doesn't have a banner.")
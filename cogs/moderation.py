@@ -3,6 +3,7 @@ import asyncio
 from discord.ext import commands, menus
 from discord import app_commands
 from typing import Optional
+from utils.purge import FILTERED_SCAN_LIMIT, PurgeEngine, PurgeProgress
 
 # This class is used to create a paginated menu for the ban list
 class BanMenuPages(discord.ui.View, menus.MenuPages):
@@ -14,12 +15,12 @@ class BanMenuPages(discord.ui.View, menus.MenuPages):
         self.message = None
 
     async def start(self, ctx : commands.Context):
-        await self._source._prepare_once()
+        await self._source.ensure_loaded()
         self.ctx = ctx
         self.message = await self.send_initial_message(ctx, ctx.channel)
 
     async def _get_kwargs_from_page(self, page):
-        """This method calls ListPageSource.format_page class"""
+        """This method calls BanSource.format_page"""
         value = await super()._get_kwargs_from_page(page)
         if 'view' not in value:
             value.update({'view': self})
@@ -29,40 +30,141 @@ class BanMenuPages(discord.ui.View, menus.MenuPages):
         """Only allow the author that invokes the command to be able to use the interaction"""
         return interaction.user == self.ctx.author
 
+    # Defer before changing pages, pages that aren't fetched yet need an API request
     @discord.ui.button(emoji='⏪', style=discord.ButtonStyle.blurple)
     async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.show_page(0)
         await interaction.response.defer(thinking=False)
+        await self.show_page(0)
 
     @discord.ui.button(emoji='◀', style=discord.ButtonStyle.blurple)
     async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.show_checked_page(self.current_page - 1)
         await interaction.response.defer(thinking=False)
+        await self.show_checked_page(self.current_page - 1)
 
     @discord.ui.button(emoji='▶', style=discord.ButtonStyle.blurple)
     async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.show_checked_page(self.current_page + 1)
         await interaction.response.defer(thinking=False)
+        await self.show_checked_page(self.current_page + 1)
 
     @discord.ui.button(emoji='⏩', style=discord.ButtonStyle.blurple)
     async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.defer(thinking=False)
+        await self._source.fetch_all() # The last page is only known once every ban is fetched
         await self.show_page(self._source.get_max_pages() - 1)
+
+    @discord.ui.button(emoji='🔎', style=discord.ButtonStyle.gray)
+    async def jump(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(BanJumpModal(self))
+
+# This modal is used to jump to a page, or to the page of a banned user, in the BanMenuPages
+class BanJumpModal(discord.ui.Modal, title="Jump to"):
+    query = discord.ui.TextInput(label="Page number, user ID or name", max_length=100)
+
+    def __init__(self, menu: BanMenuPages):
+        super().__init__()
+        self.menu = menu
+
+    async def on_submit(self, interaction: discord.Interaction):
+        query = self.query.value.strip()
         await interaction.response.defer(thinking=False)
+        source = self.menu._source
+        if query.isdigit() and len(query) < 15: # Page numbers are short, user IDs are not
+            page = int(query) - 1
+        else:
+            page = await source.find_page(query)
+            if page is None:
+                return await interaction.followup.send(f"No banned user matches `{query}`.", ephemeral=True)
+        await self.menu.show_checked_page(page)
+
+# This class fetches the ban list from the API as pages are viewed, and formats it into embeds for the BanMenuPages
+class BanSource(menus.PageSource):
+    FETCH_SIZE = 1000 # Discord returns at most 1000 bans per request
+    # Ban reasons can be 512 characters long; capped so a full page (~80 characters of name and ID plus the reason
+    # per ban) stays under the 4096 character limit of an embed description
+    MAX_REASON_LENGTH = 300
+
+    def __init__(self, guild: discord.Guild, per_page: int = 10):
+        self.guild = guild
+        self.per_page = per_page
+        self.entries: list[discord.BanEntry] = [] # Bans fetched so far, in the order the API returns them
+        self.done = False # Whether every ban has been fetched
+        self._lock = asyncio.Lock()
+
+    async def prepare(self):
+        await self.ensure_loaded()
+
+    async def ensure_loaded(self):
+        """Fetches the first chunk of bans unless it is already fetched, so an empty ban list can be detected"""
+        if not self.entries and not self.done:
+            await self.fetch_more()
+
+    async def fetch_more(self):
+        """Fetches the next chunk of bans"""
+        async with self._lock:
+            if self.done:
+                return
+            after = discord.Object(id=self.entries[-1].user.id) if self.entries else discord.utils.MISSING
+            chunk = [entry async for entry in self.guild.bans(limit=self.FETCH_SIZE, after=after)]
+            self.entries.extend(chunk)
+            if len(chunk) < self.FETCH_SIZE:
+                self.done = True
+
+    async def fetch_all(self):
+        while not self.done:
+            await self.fetch_more()
+
+    async def find_page(self, query: str) -> Optional[int]:
+        """Returns the page of the first ban matching a user ID or a name, fetching more bans as needed"""
+        if query.isdigit():
+            user_id = int(query)
+            match = lambda entry: entry.user.id == user_id
+        else:
+            query = query.lower()
+            match = lambda entry: query in entry.user.name.lower() or query in str(entry.user).lower()
+
+        index = 0
+        while True:
+            for index in range(index, len(self.entries)):
+                if match(self.entries[index]):
+                    return index // self.per_page
+            index = len(self.entries)
+            if self.done:
+                return None
+            await self.fetch_more()
+
+    def is_paginating(self):
+        return True
+
+    def get_max_pages(self):
+        """Returns the number of pages, or None while not every ban is fetched"""
+        if not self.done:
+            return None
+        return max(1, -(-len(self.entries) // self.per_page))
+
+    async def get_page(self, page_number):
+        if page_number < 0:
+            raise IndexError(page_number)
+        end = (page_number + 1) * self.per_page
+        while len(self.entries) < end and not self.done:
+            await self.fetch_more()
+        if page_number * self.per_page >= len(self.entries) and page_number > 0:
+            raise IndexError(page_number) # Past the last page
+        return self.entries[page_number * self.per_page:end]
+
+    def format_reason(self, reason: Optional[str]) -> str:
+        if reason is not None and len(reason) > self.MAX_REASON_LENGTH:
+            return reason[:self.MAX_REASON_LENGTH - 1] + "…"
+        return str(reason)
 
-# This class is used to format the ban list into an embed for the BanMenuPages
-class BanSource(menus.ListPageSource):
     async def format_page(self, menu, bans):
         embed = discord.Embed(
             title="Ban List", 
             color=discord.Color.red()
         )
-        for entry in bans:
-            embed.add_field(name="Name: ", value=f"{entry.user}", inline=False)
-            embed.add_field(name="ID: ", value=f"{entry.user.id}", inline=False)
-            embed.add_field(name="Reason: ", value=f"{entry.reason}", inline=False)
-            embed.add_field(name="===============", value="")
+        embed.description = "\n".join(f"**{entry.user}** (`{entry.user.id}`)\nReason: {self.format_reason(entry.reason)}" for entry in bans)
 
-        embed.set_footer(text=f"""Page ({menu.current_page + 1}/{menu._source.get_max_pages()})
+        max_pages = self.get_max_pages()
+        embed.set_footer(text=f"""Page ({menu.current_page + 1}/{max_pages if max_pages is not None else '?'})
         Requested by {menu.ctx.author}""")
         return embed
 
@@ -174,11 +276,11 @@ class Moderation(commands.GroupCog, name="moderation"):
     @commands.has_permissions(ban_members=True)
     async def banlist(self, ctx: commands.Context):
         """Shows a list of all the banned users"""
-        bans = [entry async for entry in ctx.guild.bans(limit=500)] # Fetch the list of banned users, limiting to 500 entries
-        if not bans:
+        formatter = BanSource(ctx.guild, per_page=10) # Create a BanSource that fetches the bans as pages are viewed
+        await formatter.ensure_loaded() # Fetch the first chunk of bans
+        if not formatter.entries:
             return await ctx.reply("No one is banned.")
 
-        formatter = BanSource(bans, per_page=2) # Create a BanSource with the list of bans and set the number of bans per page
         menu = BanMenuPages(source=formatter) # Create a BanMenuPages with the BanSource
         if ctx.interaction:
             await ctx.send("Ban List", ephemeral=False)
@@ -190,9 +292,17 @@ class Moderation(commands.GroupCog, name="moderation"):
     #===============   
     @commands.hybrid_command(name="purge", with_app_command=True)
     @commands.guild_only()
-    @app_commands.describe(count="Number of messages to delete.")
+    @app_commands.describe(
+        count="Number of messages to delete.",
+        user="Only delete messages from this member.",
+        bots="Only delete messages from bots.",
+        contains="Only delete messages that contain this text.",
+        before="Only delete messages before this message ID.",
+        after="Only delete messages after this message ID."
+    )
     @commands.has_permissions(manage_messages=True)
-    async def purge(self, ctx: commands.Context, count: int):
+    async def purge(self, ctx: commands.Context, count: int, user: Optional[discord.Member] = None, bots: Optional[bool] = None,
+                    contains: Optional[str] = None, before: Optional[str] = None, after: Optional[str] = None):
         """Deletes messages in the channel"""
         await ctx.defer(ephemeral=True)
         if count <= 0:
@@ -200,22 +310,57 @@ class Moderation(commands.GroupCog, name="moderation"):
             await asyncio.sleep(5)
             return await msg.delete()
 
+        # Message IDs are taken as text, slash command integers can't hold them
+        try:
+            before = discord.Object(id=int(before)) if before else None
+            after = discord.Object(id=int(after)) if after else None
+        except ValueError:
+            return await ctx.reply("Please enter valid message IDs for before/after.")
+
+        contains = contains.lower() if contains else None
+        def check(message: discord.Message) -> bool:
+            if user and message.author.id != user.id:
+                return False
+            if bots and not message.author.bot:
+                return False
+            if contains and contains not in message.content.lower():
+                return False
+            return True
+
+        progress_msg = await ctx.reply(f"🧹 Deleting up to {count} messages...")
+
+        async def report(progress: PurgeProgress):
+            if not progress.done:
+                await progress_msg.edit(content=f"🧹 Deleted {progress.deleted}/{count} messages ({progress.scanned} scanned)...")
+
+        exclude = {progress_msg.id}
+        if ctx.interaction is None:
+            exclude.add(ctx.message.id) # The prefix command message is deleted separately below
+        # Without filters every message matches, so count bounds the scan; filtered scans stop at FILTERED_SCAN_LIMIT
+        scan_limit = FILTERED_SCAN_LIMIT if user or bots or contains else None
+        engine = PurgeEngine(ctx.channel, count, check=check, before=before, after=after, exclude=exclude, scan_limit=scan_limit, progress=report)
         try:
-            deleted = 0
-            while count > 0:
-                to_delete = min(100, count) # Discord Limits the number of messages to be deleted to 100 at a time
-                purged = await ctx.channel.purge(limit=to_delete + 1)  # +1 for command message
-                deleted += len(purged) - 1  # subtract the command message
-                count -= to_delete # decrease the count by the number of messages deleted
-                await asyncio.sleep(3) # to avoid hitting rate limits
+            result = await engine.run()
                 
         except discord.Forbidden:
-            return await ctx.reply("Error, I couldn't delete the messages, no permissions.")
+            return await progress_msg.edit(content="Error, I couldn't delete the messages, no permissions.")
         
         except Exception as e:
-            return await ctx.reply(f"Error, I couldn't delete the messages : {e}")
-
-        await ctx.send(f"✅ Deleted {deleted} messages.", delete_after=5)
+            return await progress_msg.edit(content=f"Error, I couldn't delete the messages : {e}")
+
+        if ctx.interaction is None:
+            try:
+                await ctx.message.delete()
+            except discord.HTTPException:
+                pass
+
+        summary = f"✅ Deleted {result.deleted} messages."
+        if result.failed:
+            summary += f" {result.failed} couldn't be deleted."
+        if engine.hit_scan_limit:
+            summary += f" Stopped after scanning {engine.scanned} messages."
+        await progress_msg.edit(content=summary)
+        await progress_msg.delete(delay=5)
 
 
 # Register the cog with the bot
@@ -1,28 +1,47 @@
 import discord
 import logging
-import re
-import aiosqlite
 from discord import app_commands
 from discord.ext import commands
 
 
+DEFAULT_PREFIX = "."
+
 async def get_prefix(bot: commands.Bot, message: discord.Message):
-    """Retrieves the prefix for a specific guild from the database"""
+    """Retrieves the prefix for a specific guild from the cache, falling back to the database"""
     # Check if there is a guild 
     if not message.guild: 
         return # Prefix commands are only used in guilds
+
+    # Cached prefixes resolve from memory without touching the database
+    prefix = bot.prefixes.get(message.guild.id)
+    if prefix is not None:
+        return prefix
         
     # Get the prefix from the database for the guild
-    async with aiosqlite.connect('database.db') as db:
-        try:
-            cursor = await db.execute("SELECT prefix FROM prefixes WHERE guild_id = ?", (message.guild.id, ))
-            result = await cursor.fetchone()
-        
-        except Exception as e:
-            logging.error(f"Error fetching prefix for guild {message.guild.id}: {e}")
-            return "."
+    try:
+        result = await bot.db.fetchone("SELECT prefix FROM prefixes WHERE guild_id = ?", (message.guild.id, ))
+    
+    except Exception as e:
+        logging.error(f"Error fetching prefix for guild {message.guild.id}: {e}")
+        return DEFAULT_PREFIX
+
+    # Cache the default prefix too, so guilds without a custom prefix don't query the database again
+    prefix = result[0] if result else DEFAULT_PREFIX
+    bot.prefixes.set(message.guild.id, prefix)
+    return prefix
 
-    return result[0] if result else "."
+async def load_prefixes(bot: commands.Bot):
+    """Warms the prefix cache from the prefixes table, with the guilds of this process's shards only"""
+    query, params = "SELECT guild_id, prefix FROM prefixes", []
+    if getattr(bot, "shard_ids", None) is not None:
+        # A guild's shard is (guild_id >> 22) % shard_count
+        query += f" WHERE ((guild_id >> 22) % ?) IN ({', '.join('?' * len(bot.shard_ids))})"
+        params += [bot.shard_count, *bot.shard_ids]
+    rows = await bot.db.fetchall(query + " LIMIT ?", (*params, bot.prefixes.max_size))
+    for guild_id, prefix in rows:
+        bot.prefixes.set(guild_id, prefix)
+
+    logging.info(f"[Prefix] Loaded {len(rows)} prefixes into the cache.")
 
 class Prefix(commands.Cog):
     """Prefix cog that handles the bot's prefix commands and events"""
@@ -31,17 +50,28 @@ class Prefix(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
     
-    # on message listener to respond to mentions of the bot with its prefix
+    async def cog_load(self):
+        self.bot.register_message_handler("mention", self.on_mention)
+
+    async def cog_unload(self):
+        self.bot.unregister_message_handler("mention", self.on_mention)
+
+    # Message handler that responds to messages that only mention the bot with its prefix
+    async def on_mention(self, message: discord.Message):  
+        prefix = await get_prefix(self.bot, message) 
+        await message.reply(f"My prefix for this server is: `{prefix}`")
+
+    # Evict the cached prefix of guilds the bot has left
     @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):  
-        # Ignore messages from the bots or messages not sent in a guild
-        if message.author.bot or not message.guild:
-            return
-            
-        # Check if the message mentions the bot and respond with the prefix
-        if re.fullmatch(rf"<@!?{self.bot.user.id}>", message.content):
-            prefix = await get_prefix(self.bot, message) 
-            return await message.reply(f"My prefix for this server is: `{prefix}`")
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.bot.prefixes.pop(guild.id)
+
+    # Evict the cached prefixes of guilds the bot left while it was offline
+    @commands.Cog.listener()
+    async def on_ready(self):
+        for guild_id in self.bot.prefixes:
+            if self.bot.get_guild(guild_id) is None:
+                self.bot.prefixes.pop(guild_id)
 
 
     #====================
@@ -58,15 +88,15 @@ class Prefix(commands.Cog):
         if len(new_prefix) > 5:
             return await ctx.send(f"{ctx.author.mention}, Prefix cannot be more than 5 characters.")
 
-        async with aiosqlite.connect('database.db') as db:
-            try:
-                await db.execute("INSERT OR REPLACE INTO prefixes (guild_id, prefix) VALUES (?, ?)", (ctx.guild.id, new_prefix))
-                await db.commit()
-                
-            except Exception as e:
-                logging.error(f"Error setting prefix for guild {ctx.guild.name} ({ctx.guild.id}): {e}")
-                return await ctx.reply(f"❌ An error occurred while setting the prefix: `{e}`")
+        try:
+            await self.bot.db.execute("INSERT OR REPLACE INTO prefixes (guild_id, prefix) VALUES (?, ?)", (ctx.guild.id, new_prefix))
+            
+        except Exception as e:
+            logging.error(f"Error setting prefix for guild {ctx.guild.name} ({ctx.guild.id}): {e}")
+            return await ctx.reply(f"❌ An error occurred while setting the prefix: `{e}`")
         
+        self.bot.prefixes.set(ctx.guild.id, new_prefix) # Write-through to the prefix cache
+        await self.bot.invalidate_shared("prefixes", ctx.guild.id) # Evict the old prefix from the other processes of a cluster
         await ctx.reply(f"✅ Set the prefix to: **`{new_prefix}`**")
 
     #================
@@ -81,15 +111,9 @@ class Prefix(commands.Cog):
         await ctx.reply(f"My prefix for this server is: **`{prefix}`**")
 
 
-# Register the cog with the bot and create the database table if it doesn't exist
+# Register the cog with the bot and warm the prefix cache (the table is created by the migrations in utils/migrations.py)
 async def setup(bot: commands.Bot):
     """Registers the cog with the bot"""
-    async with aiosqlite.connect('database.db') as db:
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS prefixes (
-            guild_id INTEGER PRIMARY KEY,
-            prefix TEXT
-        )""")
-        await db.commit()
+    await load_prefixes(bot)
     
     await bot.add_cog(Prefix(bot))
\ No newline at end of file
@@ -1,14 +1,21 @@
 import discord
+import asyncio
 import logging
 import re
+import time
 import pytz, dateparser
-import aiosqlite, sqlite3
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from itertools import product
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
-from typing import List
+from typing import List, Optional
+from utils.cache import LRUCache
+from utils.metrics import Histogram
+from utils.ratelimit import TokenBucket
+from utils.scheduler import ReminderScheduler, ScheduledReminder
+from utils.time_formats import parse_time_format
+from utils.timezones import TimezoneIndex, get_timezone
 
 class ConfirmView(discord.ui.View):
     """A simple confirmation view with Cancel and Confirm buttons"""
@@ -50,6 +57,34 @@ class ConfirmView(discord.ui.View):
         self.value = True
         self.stop()
 
+class UserReminderIndex:
+    """The active reminders of recently active users, kept in memory for autocomplete"""
+    def __init__(self, max_users: int = 1000):
+        self.users = LRUCache(max_size=max_users) # User ID -> {reminder ID: (remind_at, reminder_about)}
+
+    async def get(self, db, user_id: int) -> dict:
+        """Gets a user's reminders, loading them from the database if they aren't cached"""
+        reminders = self.users.get(user_id)
+        if reminders is None:
+            rows = await db.fetchall("SELECT id, remind_at, reminder_about FROM reminders WHERE user_id = ?", (user_id, ))
+            reminders = {reminder_id: (remind_at, reminder_about) for reminder_id, remind_at, reminder_about in rows}
+            self.users.set(user_id, reminders)
+        return reminders
+
+    def add(self, user_id: int, reminder_id: int, remind_at: int, reminder_about: str):
+        """Adds or updates a reminder of a user whose reminders are loaded"""
+        reminders = self.users.peek(user_id)
+        if reminders is not None:
+            reminders[reminder_id] = (remind_at, reminder_about)
+
+    def discard(self, user_id: int, predicate=lambda reminder_id, remind_at, reminder_about: True):
+        """Removes the reminders of a user that match the predicate, all of them by default"""
+        reminders = self.users.peek(user_id)
+        if reminders is not None:
+            for reminder_id, (remind_at, reminder_about) in list(reminders.items()):
+                if predicate(reminder_id, remind_at, reminder_about):
+                    del reminders[reminder_id]
+
 class NewReminderView(discord.ui.View):
     def __init__(self, timeout: int = None, remind_at: str = None, about: str = None, og_reminder_creator: discord.User = None):
         super().__init__(timeout=timeout)
@@ -61,117 +96,81 @@ class NewReminderView(discord.ui.View):
 
     @discord.ui.button(label="Remind me too", style=discord.ButtonStyle.secondary, emoji="🔔")
     async def remindme_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        db = interaction.client.db
         # Check if the user already has the reminder in the database
-        async with aiosqlite.connect('database.db') as db:
-            cursor = await db.execute(
-                "SELECT 1 FROM reminders WHERE remind_at = ? AND reminder_about = ? AND user_id = ?",
-                (self.remind_at, self.reminder_about, interaction.user.id)
-            )
-            result = await cursor.fetchone()
-            if result is None:
-                try:
-                    remind_at_datetime = datetime.fromtimestamp(self.remind_at) # Convert the remind_at timestamp to a datetime object
-                    timezone = await get_user_timezone(self.og_reminder_creator) # Get the timezone of the original reminder creator
-                    remind_at_datetime = timezone.localize(remind_at_datetime) # Localize the datetime to the original creator's timezone
-                    now = datetime.now(tz=timezone) # Get the current time in the original creator's timezone
-                    # Check if the reminder time is in the past
-                    if now > remind_at_datetime:
-                        logging.warning(f"[Reminder] User {interaction.user.name} ({interaction.user.id}) tried to set a reminder for a past time: Now = {now}, Reminder at = ({remind_at_datetime}).")
-                        await interaction.response.send_message("This reminder has expired.", ephemeral=True)
-
-                    else:
-                        # Insert the reminder into the database for the user
-                        await db.execute(
-                            "INSERT INTO reminders (user_id, reminder_about, remind_at) VALUES (?, ?, ?)",
-                            (interaction.user.id, self.reminder_about, self.remind_at)
-                        )
-                        await db.commit()
-                        await interaction.response.send_message(
-                            f"Alright {interaction.user.name}, I will also remind you about **{self.reminder_about}** {discord.utils.format_dt(remind_at_datetime, style='R')}.", ephemeral=True
-                        )
-                except ValueError as e:
-                    logging.error(f"[Reminder Error] Failed to parse timestamp {self.remind_at}: {e}")
-                    return await interaction.response.send_message("An unexpected error occurred while setting the reminder. Please try again.", ephemeral=True)
+        result = await db.fetchone(
+            "SELECT 1 FROM reminders WHERE remind_at = ? AND reminder_about = ? AND user_id = ?",
+            (self.remind_at, self.reminder_about, interaction.user.id)
+        )
+        if result is None:
+            try:
+                remind_at_datetime = datetime.fromtimestamp(self.remind_at) # Convert the remind_at timestamp to a datetime object
+                timezone = await get_user_timezone(interaction.client, self.og_reminder_creator) # Get the timezone of the original reminder creator
+                remind_at_datetime = timezone.localize(remind_at_datetime) # Localize the datetime to the original creator's timezone
+                now = datetime.now(tz=timezone) # Get the current time in the original creator's timezone
+                # Check if the reminder time is in the past
+                if now > remind_at_datetime:
+                    logging.warning(f"[Reminder] User {interaction.user.name} ({interaction.user.id}) tried to set a reminder for a past time: Now = {now}, Reminder at = ({remind_at_datetime}).")
+                    await interaction.response.send_message("This reminder has expired.", ephemeral=True)
 
-                except Exception as e:
-                    logging.error(
-                        f"[Reminder Error] Failed to insert reminder for user {interaction.user.name} ({interaction.user.id}) with time {self.remind_at}: {e}")
-                    return await interaction.response.send_message(f"An unexpected error occurred while setting the reminder.", ephemeral=True)
-                       
+                else:
+                    # Insert the reminder into the database for the user and schedule it
+                    reminder_id = await db.insert(
+                        "INSERT INTO reminders (user_id, reminder_about, remind_at) VALUES (?, ?, ?)",
+                        (interaction.user.id, self.reminder_about, self.remind_at)
+                    )
+                    cog = interaction.client.get_cog("Reminder")
+                    if cog:
+                        cog.schedule(ScheduledReminder(self.remind_at, reminder_id, interaction.user.id, self.reminder_about))
+                        cog.reminder_index.add(interaction.user.id, reminder_id, self.remind_at, self.reminder_about)
+                        await cog.reminders_changed(interaction.user.id)
+                    await interaction.response.send_message(
+                        f"Alright {interaction.user.name}, I will also remind you about **{self.reminder_about}** {discord.utils.format_dt(remind_at_datetime, style='R')}.", ephemeral=True
+                    )
+            except ValueError as e:
+                logging.error(f"[Reminder Error] Failed to parse timestamp {self.remind_at}: {e}")
+                return await interaction.response.send_message("An unexpected error occurred while setting the reminder. Please try again.", ephemeral=True)
 
-            else:
-                await interaction.response.send_message("Error: Duplicate reminder. You already have a reminder set with the same time and reason.", ephemeral=True)
+            except Exception as e:
+                logging.error(
+                    f"[Reminder Error] Failed to insert reminder for user {interaction.user.name} ({interaction.user.id}) with time {self.remind_at}: {e}")
+                return await interaction.response.send_message(f"An unexpected error occurred while setting the reminder.", ephemeral=True)
+                   
+
+        else:
+            await interaction.response.send_message("Error: Duplicate reminder. You already have a reminder set with the same time and reason.", ephemeral=True)
 
     @discord.ui.button(label="Cancel for me", style=discord.ButtonStyle.secondary, emoji="❌")
     async def cancel_reminder(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Check if the user already has the reminder in the database
-        async with aiosqlite.connect('database.db') as db:
-            cursor = await db.execute(
-                "SELECT 1 FROM reminders WHERE remind_at = ? AND reminder_about = ? AND user_id = ?",
+        try:
+            # Delete the reminder for the user, if they have it set
+            deleted = await interaction.client.db.execute(
+                "DELETE FROM reminders WHERE remind_at = ? AND reminder_about = ? AND user_id = ?",
                 (self.remind_at, self.reminder_about, interaction.user.id)
             )
-            result = await cursor.fetchone()
-            if result is None:
-                await interaction.response.send_message("You don't have this reminder set.", ephemeral=True)
-            else:
-                try:
-                    # Delete the reminder for the user
-                    await db.execute(
-                        "DELETE FROM reminders WHERE remind_at = ? AND reminder_about = ? AND user_id = ?",
-                        (self.remind_at, self.reminder_about, interaction.user.id)
-                    )
-                    await db.commit()
-                    logging.info(f"[Reminder] Deleted reminder for user {interaction.user.name} ({interaction.user.id}) with time {self.remind_at} and about {self.reminder_about}.")
-                    await interaction.response.send_message(f"✅ Successfully canceled reminder for **{self.reminder_about}**", ephemeral=True)
 
-                except Exception as e:
-                    logging.error(f"[Reminder Error] Failed to delete reminder with id for user {interaction.user.name}({interaction.user.id}) with time {self.remind_at} and about {self.reminder_about}: {e}")
-                    await interaction.response.send_message(f"Error: Failed to remove reminder.", ephemeral=True)
-
-
-def get_datetime_format(remind_at: str):
-    """Gets the datetime format from the user input string"""
-    date_formats = [
-        # Year first
-        "%Y-%m-%d", "%Y/%m/%d", "%Y %m %d", # 2025-01-25, 2025/01/25, 2025 01 25
-        "%Y-%b-%d", "%Y/%b/%d", "%Y %b %d", # 2025-Jan-25, 2025/Jan/25, 2025 Jan 25
-        "%Y-%B-%d", "%Y/%B/%d", "%Y %B %d", # 2025-January-25, 2025/January/25, 2025 January 25
-        "%Y-%m", "%Y/%m", "%Y %m", # 2025-01, 2025/01, 2025 01
-        "%Y-%b", "%Y/%b", "%Y %b", # 2025-Jan, 2025/Jan, 2025 Jan
-        "%Y-%B", "%Y/%B", "%Y %B", # 2025-January, 2025/January, 2025 January
-        # Day first
-        "%d-%m-%Y", "%d/%m/%Y", "%d %m %Y", # 25-01-2025, 25/01/2025, 25 01 2025
-        "%d-%b-%Y", "%d/%b/%Y", "%d %b %Y", # 25-Jan-2025, 25/Jan/2025, 25 Jan 2025
-        "%d-%B-%Y", "%d/%B/%Y", "%d %B %Y", # 25-January-2025, 25/January/2025, 25 January 2025
-        "%d-%m", "%d/%m", "%d %m", # 25-01, 25/01, 25 01
-        "%d-%b", "%d/%b", "%d %b", # 25-Jan, 25/Jan, 25 Jan
-        "%d-%B", "%d/%B", "%d %B", # 25-January, 25/January, 25 January
-        "%a", "%A", # Wed, Wednesday
-        # Month first
-        "%m-%d", "%m/%d", "%m %d", # 01-25, 01/25, 01 25
-        "%b-%d", "%b/%d", "%b %d", # Jan-25, Jan/25, Jan 25
-        "%B-%d", "%B/%d", "%B %d", # January-25, January/25, January 25
-    ]
-    time_formats = [
-        "%I:%M %p", # 12:00 PM
-        "%I:%M%p", # 12:00PM
-        "%H:%M", # 12:00
-        "%I %p", # 12 PM
-        "%I%p" # 12PM
-    ]
-    # Combined format for both date and time format lists
-    combined_formats = [f"{date} {time}" for date, time in product(date_formats, time_formats)]
-    valid_formats = combined_formats + date_formats + time_formats
-    
-    for frmt in valid_formats: 
-        try:
-            # Try to parse the remind_at string with the current format
-            datetime.strptime(remind_at, frmt) 
-            return frmt
+        except Exception as e:
+            logging.error(f"[Reminder Error] Failed to delete reminder with id for user {interaction.user.name}({interaction.user.id}) with time {self.remind_at} and about {self.reminder_about}: {e}")
+            return await interaction.response.send_message(f"Error: Failed to remove reminder.", ephemeral=True)
+
+        if not deleted:
+            return await interaction.response.send_message("You don't have this reminder set.", ephemeral=True)
+
+        cog = interaction.client.get_cog("Reminder")
+        if cog:
+            cog.scheduler.discard(
+                lambda reminder: reminder.user_id == interaction.user.id
+                and reminder.remind_at == self.remind_at and reminder.reminder_about == self.reminder_about
+            )
+            cog.reminder_index.discard(
+                interaction.user.id,
+                lambda reminder_id, remind_at, reminder_about: remind_at == self.remind_at and reminder_about == self.reminder_about
+            )
+            await cog.reminders_changed(interaction.user.id)
+
+        logging.info(f"[Reminder] Deleted reminder for user {interaction.user.name} ({interaction.user.id}) with time {self.remind_at} and about {self.reminder_about}.")
+        await interaction.response.send_message(f"✅ Successfully canceled reminder for **{self.reminder_about}**", ephemeral=True)
 
-        except ValueError:
-            continue
-    return None
 
 def parse_relative_time(remind_at: str, user_timezone: str):
     """Parsed the relative time string into a datetime object"""
@@ -212,18 +211,19 @@ def parse_relative_time(remind_at: str, user_timezone: str):
             continue
     return result if valid else None
 
-async def get_user_timezone(user: discord.User):
-    """Gets the user's timezone from the database"""
+async def get_user_timezone(bot: commands.Bot, user: discord.User):
+    """Gets the user's timezone from the cache, falling back to the database"""
+    timezone = bot.timezones.get(user.id)
+    if timezone is not None:
+        return timezone
+
+    result = None
     try:
-        async with aiosqlite.connect('database.db') as db:
-            cursor = await db.execute("SELECT timezone FROM user_timezones WHERE user_id = ?", (user.id, ))
-            result = await cursor.fetchone()
-            if result:
-                timezone = result[0] # Get the timezone string from the result tuple
-                timezone = pytz.timezone(timezone) # Convert the timezone string to a pytz timezone object
-                return timezone if timezone else pytz.UTC # Return UTC if no timezone is set or if the timezone is None
-            else:
-                return pytz.UTC # Return UTC if no result is found
+        result = await bot.db.fetchone("SELECT timezone FROM user_timezones WHERE user_id = ?", (user.id, ))
+        # Users without a timezone are cached as UTC too, so they don't hit the database every time
+        timezone = get_timezone(result[0]) if result and result[0] else pytz.UTC
+        bot.timezones.set(user.id, timezone)
+        return timezone
 
     except Exception as e:
         logging.error(f"[Reminder Error] Failed to get timezone for user {user.name} ({user.id}), timezone = {result}: {e}")
@@ -246,58 +246,195 @@ def format_utc_offset(timezone: pytz.BaseTzInfo) -> str:
         utc_offset = f"{utc_offset}:00"
     return utc_offset    
 
+# How far the relative base is moved to tell relative dateparser results ("in an hour") from absolute ones ("tomorrow at 5 pm")
+NATURAL_PARSE_SHIFT = timedelta(minutes=1)
+
+def parse_natural_time(remind_at: str, now: datetime) -> tuple:
+    """Parses natural language with dateparser (blocking), returns the result and the entry to cache for it"""
+    settings = {'TIMEZONE': now.tzinfo.zone, 'RETURN_AS_TIMEZONE_AWARE': True, 'RELATIVE_BASE': now.replace(tzinfo=None)}
+    result = dateparser.parse(remind_at, settings=settings)
+    if result is None:
+        return None, ("none", None)
+
+    # Parse again from a shifted base to know if the result depends on the current time
+    shifted = dateparser.parse(remind_at, settings={**settings, 'RELATIVE_BASE': settings['RELATIVE_BASE'] + NATURAL_PARSE_SHIFT})
+    if shifted == result:
+        return result, ("absolute", result)
+    if shifted is not None and shifted - result == NATURAL_PARSE_SHIFT:
+        return result, ("relative", result - now)
+    return result, None # Neither, so it isn't cached
+
 class Reminder(commands.Cog):
     """Reminder cog to set reminders for users"""
+    DELIVERY_WORKERS = 10 # How many reminders are sent concurrently
+    DM_RATE = 5 # How many DMs are sent per second at most
+    MAX_DELIVERY_ATTEMPTS = 5 # How many times a reminder is tried before giving up
+    PARSE_CACHE_SIZE = 2048 # How many natural language inputs are remembered
+    SCHEDULER_POLL_INTERVAL = 30 # Seconds between database polls when other processes also add reminders
+
     def __init__(self, bot: commands.Bot):
         # Initialize the cog with the bot instance
         self.bot = bot
-        # Start the reminder checking loop
-        self.check_reminders.start()
+        # The scheduler that sleeps until the next reminder is due
+        # With the shards split between processes, reminders set through other processes are only picked up by polling
+        poll_interval = self.SCHEDULER_POLL_INTERVAL if getattr(bot, "shard_ids", None) is not None else None
+        self.scheduler = ReminderScheduler(bot.db, self.deliver_reminders, poll_interval=poll_interval)
+        self.scheduler_task = None
+        self.dm_limiter = TokenBucket(self.DM_RATE)
+        self.delivery_attempts = {} # Reminder ID -> failed delivery attempts
+        # dateparser is slow, so it runs in its own thread with its recent results cached
+        self.parse_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dateparser")
+        self.parse_cache = LRUCache(max_size=self.PARSE_CACHE_SIZE) # (input, timezone, date) -> cache entry
+        self.parse_latency = Histogram()
+        # Indexes used by the autocompletes
+        self.timezone_index = TimezoneIndex()
+        self.reminder_index = UserReminderIndex()
+
+    async def cog_load(self):
+        self.bot.metrics.register_histogram("reminder_parse_seconds", "Time taken by natural language time parsing", self.parse_latency)
+        # Start the reminder scheduler, only one process delivers reminders when the shards are split between processes
+        if getattr(self.bot, "is_primary", True):
+            self.bot.metrics.gauge("reminders_scheduled", "Reminders held in the scheduler's memory", lambda: len(self.scheduler))
+            self.bot.metrics.gauge("reminders_overdue", "Reminders that are due but not delivered yet", self.scheduler.overdue)
+            self.scheduler_task = asyncio.create_task(self.run_scheduler())
+        if getattr(self.bot, "ipc", None):
+            self.bot.ipc.handler("reminders", self.on_ipc_reminders)
+        # Load dateparser's language data in the background so the first reminder doesn't pay for it
+        asyncio.get_running_loop().run_in_executor(self.parse_executor, dateparser.parse, "in 1 hour")
+
+    async def cog_unload(self):
+        # Stop the reminder scheduler
+        if self.scheduler_task:
+            self.scheduler_task.cancel()
+        if getattr(self.bot, "ipc", None):
+            self.bot.ipc.remove_handler("reminders", self.on_ipc_reminders)
+        self.parse_executor.shutdown(wait=False)
+
+    def schedule(self, reminder: ScheduledReminder):
+        """Adds a new reminder to the scheduler, if this process runs it"""
+        if self.scheduler_task:
+            self.scheduler.add(reminder)
+
+    async def reminders_changed(self, user_id: int):
+        """Tells the other processes of a cluster that a user's reminders changed"""
+        await self.bot.broadcast("reminders", user_id=user_id)
+
+    async def on_ipc_reminders(self, data: dict):
+        # Another process changed a user's reminders: reload them, and wake the scheduler if this process runs it
+        self.reminder_index.users.pop(data["user_id"])
+        if self.scheduler_task:
+            self.scheduler.invalidate()
+
+    async def parse_natural_time(self, remind_at: str, now: datetime) -> Optional[datetime]:
+        """Parses natural language like 'tomorrow at 5 pm' without blocking the event loop"""
+        # Cache by the normalized input, the timezone and the date, since results like 'friday' depend on the day
+        key = (" ".join(remind_at.lower().split()), now.tzinfo.zone, now.date())
+        entry = self.parse_cache.get(key)
+        if entry is None:
+            start = time.perf_counter()
+            result, entry = await asyncio.get_running_loop().run_in_executor(self.parse_executor, parse_natural_time, remind_at, now)
+            self.parse_latency.observe(time.perf_counter() - start)
+            if entry is not None:
+                self.parse_cache.set(key, entry)
+            return result
+
+        kind, value = entry
+        if kind == "absolute":
+            return value
+        if kind == "relative":
+            return now.tzinfo.normalize(now + value) # Relative results are stored as an offset from now
+        return None
+
+    async def run_scheduler(self):
+        """Runs the reminder scheduler once the bot is ready"""
+        await self.bot.wait_until_ready()
+        await self.scheduler.run()
     
-    # Background task to check for reminders every 30 seconds
-    @tasks.loop(seconds=30)
-    async def check_reminders(self):
-        """Checks for any ongoing reminders"""
-        # Get the current time in UTC and convert it to a timestamp
+    async def deliver_reminders(self, reminders: List[ScheduledReminder]):
+        """Sends the reminders that are due using a bounded pool of workers"""
+        # Get the current time in UTC
         now_datetime = discord.utils.utcnow()
-        now = int(now_datetime.timestamp()) 
-        # Connect to the database and fetch reminders that are due
-        async with aiosqlite.connect("database.db") as db:
-            async with db.execute("SELECT user_id, reminder_about FROM reminders WHERE remind_at <= ?", (now, )) as cursor:
-                rows = await cursor.fetchall()
-
-            for user_id, reminder_about in rows:
+        queue = asyncio.Queue()
+        for reminder in reminders:
+            queue.put_nowait(reminder)
+        outcomes = {"delivered": 0, "failed": 0, "retry": 0}
+
+        async def worker():
+            while not queue.empty():
+                reminder = queue.get_nowait()
                 try:
-                    user = await self.bot.fetch_user(user_id)
-                    if user is None:
-                        logging.error(f"[Reminder Error] User ID {user_id} not found (None)")
-                        continue
-                    
-                    # Send a DM to the user with the reminder message
-                    embed = discord.Embed(title="Reminder",
-                      description=f"Hey {user.mention}, You asked me to remind you of **{reminder_about}** at {discord.utils.format_dt(now_datetime, style='f')}",
-                      colour=0x00b0f4,
-                      timestamp=discord.utils.utcnow())
-
-                    await user.send(embed=embed)
-
-                except discord.Forbidden:
-                    return logging.error(f"[Reminder Error] Cannot send DM to user {user_id} (forbidden).")                
-                    
+                    outcomes[await self.deliver_reminder(reminder, now_datetime)] += 1
                 except Exception as e:
-                    logging.error(f"[Reminder Error] Failed to send reminder: {e}")
+                    logging.error(f"[Reminder Error] Failed to finish delivering reminder {reminder.id}: {e}")
 
-            # Delete reminders that are sent or expired
-            await db.execute("DELETE FROM reminders WHERE remind_at <= ?", (now,))
-            await db.commit()
-            if len(rows) > 0:
-                logging.info(f"[Reminder] Checked reminders at {now_datetime}, deleted {len(rows)} reminders that were due.")
+        await asyncio.gather(*(worker() for _ in range(min(self.DELIVERY_WORKERS, len(reminders)))))
+        logging.info(
+            f"[Reminder] Processed {len(reminders)} due reminders at {now_datetime}: "
+            f"{outcomes['delivered']} delivered, {outcomes['failed']} failed, {outcomes['retry']} to retry."
+        )
 
-    
-    # Ensure the loop runs after the bot is ready
-    @check_reminders.before_loop
-    async def before_loop(self):
-        await self.bot.wait_until_ready()
+    async def deliver_reminder(self, reminder: ScheduledReminder, now_datetime: datetime) -> str:
+        """Sends a single reminder and returns its delivery state: delivered, failed or retry"""
+        try:
+            # Use the cached user and only fall back to the API if it isn't cached
+            user = self.bot.get_user(reminder.user_id) or await self.bot.fetch_user(reminder.user_id)
+            
+            # Send a DM to the user with the reminder message
+            embed = discord.Embed(title="Reminder",
+              description=f"Hey {user.mention}, You asked me to remind you of **{reminder.reminder_about}** at {discord.utils.format_dt(now_datetime, style='f')}",
+              colour=0x00b0f4,
+              timestamp=discord.utils.utcnow())
+
+            await self.dm_limiter.acquire() # Stay under Discord's DM rate limits
+            await user.send(embed=embed)
+            state = "delivered"
+
+        except (discord.Forbidden, discord.NotFound) as e:
+            # The user can't be reached, retrying won't help
+            logging.error(f"[Reminder Error] Cannot send DM to user {reminder.user_id}: {e}")
+            state = "failed"
+
+        except discord.HTTPException as e:
+            logging.error(f"[Reminder Error] Failed to send reminder {reminder.id} to user {reminder.user_id}: {e}")
+            state = "retry" if e.status >= 500 or e.status == 429 else "failed"
+
+        except Exception as e:
+            logging.error(f"[Reminder Error] Failed to send reminder {reminder.id} to user {reminder.user_id}: {e}")
+            state = "retry"
+
+        if state == "retry":
+            attempts = self.delivery_attempts.get(reminder.id, 0) + 1
+            if attempts < self.MAX_DELIVERY_ATTEMPTS:
+                # Push the reminder back with an exponential backoff, keeping it in the database so it isn't lost
+                self.delivery_attempts[reminder.id] = attempts
+                retry_at = int(time.time()) + 30 * 2 ** (attempts - 1)
+                await self.bot.db.execute("UPDATE reminders SET remind_at = ? WHERE id = ?", (retry_at, reminder.id))
+                self.scheduler.add(reminder._replace(remind_at=retry_at))
+                self.reminder_index.add(reminder.user_id, reminder.id, retry_at, reminder.reminder_about)
+                await self.reminders_changed(reminder.user_id)
+                return state
+
+            logging.error(f"[Reminder Error] Giving up on reminder {reminder.id} after {attempts} attempts.")
+            state = "failed"
+
+        # Delete the reminder right away so it is never sent twice
+        self.delivery_attempts.pop(reminder.id, None)
+        await self.bot.db.execute("DELETE FROM reminders WHERE id = ?", (reminder.id, ))
+        self.reminder_index.discard(reminder.user_id, lambda reminder_id, remind_at, reminder_about: reminder_id == reminder.id)
+        await self.reminders_changed(reminder.user_id)
+        return state
+
+    # Owner-only command to show the natural language parsing statistics
+    @commands.command(name="parsestats")
+    @commands.is_owner()
+    async def parse_stats(self, ctx: commands.Context):
+        cache = self.parse_cache.stats()
+        latency = self.parse_latency.summary()
+        await ctx.reply(
+            f"**Parse cache:** {cache['size']}/{cache['max_size']} entries, {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.1%})\n"
+            f"**dateparser latency:** {latency['count']} parses, avg {latency['avg_ms']:.1f}ms, "
+            f"p50 {latency['p50_ms']:.1f}ms, p95 {latency['p95_ms']:.1f}ms, max {latency['max_ms']:.1f}ms"
+        )
 
     # Define a group for reminder commands
     reminder_group = app_commands.Group(name="reminder", description="Reminder commands")
@@ -315,72 +452,46 @@ class Reminder(commands.Cog):
             logging.warning(f"[Reminder] User {interaction.user.name} ({interaction.user.id}) tried to set a reminder with too long reason: {about}")
             return await interaction.edit_original_response(content="Reminder reason is too long! Maximum length is 30 characters.")
         # Get the user's timezone
-        user_timezone = await get_user_timezone(interaction.user)
+        user_timezone = await get_user_timezone(self.bot, interaction.user)
         logging.info(f"[Reminder] User timezone: {user_timezone} for user {interaction.user.name} ({interaction.user.id})")
         # Get the current time in the user's timezone
         now = datetime.now(tz=user_timezone)
-        # Get the datetime format from the user input
-        format_str = get_datetime_format(remind_at)
+        # Parse the user input if it is one of the absolute datetime formats
+        parsed = parse_time_format(remind_at)
         # Try relative time parsing
         relative_time = parse_relative_time(remind_at, user_timezone)
-        # Try natural language parsing using dateparser
-        natural_parsed = dateparser.parse(
-            remind_at, settings={'TIMEZONE': user_timezone.zone, 'RETURN_AS_TIMEZONE_AWARE': True}
-        ) 
-        # Try datetime parsing if the user input is a valid datetime format
-        if format_str:
-            time_only_formats = ["%I:%M %p", "%I:%M%p", "%H:%M", "%I %p", "%I%p"] # Formats that only contain time, no date
-            month_only_formats = ["%Y-%m", "%Y/%m", "%Y %m", "%Y-%b", "%Y/%b", "%Y %b", "%Y-%B", "%Y/%B", "%Y %B"] # Formats that only contain month and year
-            formatstr_has_day_name = "%a" in format_str or "%A" in format_str # Check if the format string contains a day name
-            try:
-                remind_at_datetime = datetime.strptime(remind_at, format_str) # Parse the time with the correct format
-                logging.info(f"[Reminder] Parsed datetime '{remind_at}' with format '{format_str}' for user {interaction.user.name} ({interaction.user.id})")
-
-            except ValueError as e: 
-                logging.error(f"[Reminder Error] Failed to parse datetime '{remind_at}' with format '{format_str}'")
-                return await interaction.edit_original_response(
-                    content=f"Invalid datetime format. Use formats like `2025-07-20`, `20-7 10 AM`, or `9 PM`."
-                )
-            # Set year, month, and day for time only formats or day formats
-            if format_str in time_only_formats or formatstr_has_day_name: 
-                remind_at_datetime = remind_at_datetime.replace(year=now.year, month=now.month, day=now.day)
-
-             # Check if there's a day name in the user input
-            if "%a" in format_str or "%A" in format_str:
-                # Week days and their corresponding integer value
-                WEEKDAYS = {
-                    "monday": 0, "mon": 0,
-                    "tuesday": 1, "tue": 1, "tues": 1,
-                    "wednesday": 2, "wed": 2,
-                    "thursday": 3, "thu": 3, "thurs": 3,
-                    "friday": 4, "fri": 4,
-                    "saturday": 5, "sat": 5,
-                    "sunday": 6, "sun": 6
-                }
-                weekday_str = remind_at.split()[0].lower() # Get the week day string from user input
-                target_weekday = WEEKDAYS.get(weekday_str) # Get the corresponding integer value of the week day
-                if target_weekday is not None:
-                    current_weekday = now.weekday() # Integer value of today
-                    days_until = (target_weekday - current_weekday + 7) % 7 or 7 # Get the number of days until the target week day
-                    # Construct the correct datetime
+        # Build the datetime if the user input is a valid datetime format
+        if parsed:
+            logging.info(f"[Reminder] Parsed datetime '{remind_at}' with format '{parsed.format}' for user {interaction.user.name} ({interaction.user.id})")
+            # Check if there's a day name in the user input
+            if parsed.weekday is not None:
+                current_weekday = now.weekday() # Integer value of today
+                days_until = (parsed.weekday - current_weekday + 7) % 7 or 7 # Get the number of days until the target week day
+                # Construct the correct datetime
+                remind_at_datetime = datetime(
+                    year=now.year,
+                    month=now.month,
+                    day=now.day,
+                    hour=parsed.hour,
+                    minute=parsed.minute,
+                ) + relativedelta(days=days_until)
+            else:
+                try:
+                    # Default to today for time only formats, to today's day for formats with month and year only
+                    # and to the current year for formats with no year
                     remind_at_datetime = datetime(
-                        year=now.year,
-                        month=now.month,
-                        day=now.day,
-                        hour=remind_at_datetime.hour,
-                        minute=remind_at_datetime.minute,
-                    ) + relativedelta(days=days_until)
-                else:
-                    logging.warning(f"[Reminder] Invalid weekday in '{remind_at}' for day format '{format_str}'")
+                        year=parsed.year or now.year,
+                        month=parsed.month or now.month,
+                        day=parsed.day or now.day,
+                        hour=parsed.hour,
+                        minute=parsed.minute,
+                    )
+
+                except ValueError as e: 
+                    logging.error(f"[Reminder Error] Failed to parse datetime '{remind_at}' with format '{parsed.format}': {e}")
                     return await interaction.edit_original_response(
-                        content="Invalid day name. Use formats like `Monday 9:30 PM` or `Wednesday`."
+                        content=f"Invalid datetime format. Use formats like `2025-07-20`, `20-7 10 AM`, or `9 PM`."
                     )
-            # Set default day to today for formats with month and year only
-            if format_str in month_only_formats:
-                remind_at_datetime = remind_at_datetime.replace(day=now.day)
-            # Set default year to current year for formats with no year 
-            if "%Y" not in format_str:
-                remind_at_datetime = remind_at_datetime.replace(year=now.year)
             
             # Localize the datetime to the user's timezone
             remind_at_datetime = user_timezone.localize(remind_at_datetime)
@@ -389,13 +500,13 @@ class Reminder(commands.Cog):
             # Handle past dates
             if now > remind_at_datetime:
                 # Set day to next day for past time only formats
-                if format_str in time_only_formats:
+                if parsed.is_time_only:
                     remind_at_datetime += relativedelta(days=1)
                 # Set the day to the same day in next week if the target day is today 
-                elif formatstr_has_day_name:
+                elif parsed.weekday is not None:
                     remind_at_datetime += relativedelta(days=7)
                 # Set year to next year for past formats with no year
-                elif "%Y" not in format_str:
+                elif parsed.year is None:
                     remind_at_datetime += relativedelta(years=1)
 
                 else:
@@ -411,7 +522,7 @@ class Reminder(commands.Cog):
                     content="Invalid relative time. Use formats like `5 minutes`, `1.5 hours`, `2 days`, or `1 month`."
                 )
         # Try natural language parsing if the custom datetime parsing and relative time parsing didn't work
-        elif natural_parsed:
+        elif natural_parsed := await self.parse_natural_time(remind_at, now):
             remind_at_datetime = natural_parsed
             if now > natural_parsed: # If parsing using dateparser has failed
                 logging.warning(f"[Reminder] Invalid or past dateparser time: '{remind_at}', result={remind_at_datetime}")
@@ -427,31 +538,31 @@ class Reminder(commands.Cog):
         
         # Finally convert the remind_at datetime object to a UTC timestamp for storage
         remind_at = int(remind_at_datetime.astimezone(pytz.UTC).timestamp())
-        async with aiosqlite.connect('database.db') as db:
-            # Insert the reminder into the database
-            try:
-                cursor = await db.execute(
-                    "SELECT reminder_about FROM reminders WHERE remind_at = ? AND user_id = ?",
-                    (remind_at, interaction.user.id)
-                )
-                result = await cursor.fetchall()
-                for (reminder_about, ) in result:
-                    # Check if the reminder already exists for the user
-                    if about.strip().lower() == reminder_about.strip().lower():
-                        return await interaction.edit_original_response(
-                            content="Error: Duplicate reminder. You already have a reminder set with the same time and reason."
-                        )
-
-                await db.execute(
-                    "INSERT INTO reminders (user_id, reminder_about, remind_at) VALUES (?, ?, ?)",
-                    (interaction.user.id, about, remind_at)
-                )
-                logging.info(f"[Reminder] Inserted reminder: user={interaction.user.id}, about='{about}', remind_at={remind_at}")
-                await db.commit()
+        # Insert the reminder into the database
+        try:
+            result = await self.bot.db.fetchall(
+                "SELECT reminder_about FROM reminders WHERE remind_at = ? AND user_id = ?",
+                (remind_at, interaction.user.id)
+            )
+            for (reminder_about, ) in result:
+                # Check if the reminder already exists for the user
+                if about.strip().lower() == reminder_about.strip().lower():
+                    return await interaction.edit_original_response(
+                        content="Error: Duplicate reminder. You already have a reminder set with the same time and reason."
+                    )
 
-            except Exception as e:
-                logging.error(f"[Reminder Error] Failed to insert reminder: {e}")
-                return await interaction.edit_original_response(content=f"An unexpected error occurred while setting the reminder.")
+            reminder_id = await self.bot.db.insert(
+                "INSERT INTO reminders (user_id, reminder_about, remind_at) VALUES (?, ?, ?)",
+                (interaction.user.id, about, remind_at)
+            )
+            self.schedule(ScheduledReminder(remind_at, reminder_id, interaction.user.id, about))
+            self.reminder_index.add(interaction.user.id, reminder_id, remind_at, about)
+            await self.reminders_changed(interaction.user.id)
+            logging.info(f"[Reminder] Inserted reminder: user={interaction.user.id}, about='{about}', remind_at={remind_at}")
+
+        except Exception as e:
+            logging.error(f"[Reminder Error] Failed to insert reminder: {e}")
+            return await interaction.edit_original_response(content=f"An unexpected error occurred while setting the reminder.")
 
         embed = discord.Embed(title="New Reminder", timestamp=discord.utils.utcnow(), color=discord.Color.blurple())
         embed.description = f"Alright {interaction.user.name}, I'll remind you about **{about}** {discord.utils.format_dt(remind_at_datetime, style='R')}."
@@ -464,31 +575,41 @@ class Reminder(commands.Cog):
     #=========================
     # REMOVE REMINDER COMMAND
     #=========================
-    async def reminder_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-        """Autocompletes timezone input"""
-        matches =  [
-            app_commands.Choice(name=tz, value=tz)
-            for tz in (pytz.all_timezones) if current.lower() in tz.lower() and len(tz) < 100
-        ]
-        return matches[:25]
+    async def reminder_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[int]]:
+        """Autocompletes the IDs of the user's reminders"""
+        reminders = await self.reminder_index.get(self.bot.db, interaction.user.id)
+        user_timezone = await get_user_timezone(self.bot, interaction.user)
+        current = current.strip().lower()
+        matches = []
+        # Show the reminders that are due soonest first, matching by ID or by what they are about
+        for reminder_id, (remind_at, reminder_about) in sorted(reminders.items(), key=lambda item: item[1][0]):
+            reminder_about = reminder_about or ""
+            if current and not (str(reminder_id).startswith(current) or current in reminder_about.lower()):
+                continue
+            when = datetime.fromtimestamp(remind_at, tz=pytz.UTC).astimezone(user_timezone).strftime("%Y-%m-%d %H:%M")
+            matches.append(app_commands.Choice(name=f"ID: {reminder_id} - {when} - {reminder_about}"[:100], value=reminder_id))
+            # Limit the number of options to 25 to avoid hitting Discord's limit
+            if len(matches) >= 25:
+                break
+        return matches
         
     @reminder_group.command(name="remove")
     @app_commands.describe(id="ID of the reminder to remove")
+    @app_commands.autocomplete(id=reminder_autocomplete)
     async def reminder_remove(self, interaction: discord.Interaction, id: int):
         """Removes a reminder by its ID"""
-        async with aiosqlite.connect('database.db') as db:
-            cursor = await db.execute("SELECT 1 FROM reminders WHERE id = ? AND user_id = ?", (id, interaction.user.id))
-            result = await cursor.fetchone()
+        try:
+            deleted = await self.bot.db.execute("DELETE FROM reminders WHERE id = ? AND user_id = ?", (id, interaction.user.id))
+        except Exception as e:
+            logging.error(f"[Reminder Error] Failed to delete reminder with id {id} for user {interaction.user.name}({interaction.user.id}): {e}")
+            return await interaction.response.send_message(f"Error: Failed to remove reminder with ID: {id}.")
 
-            if result is None:
-                return await interaction.response.send_message("No reminder for you was found with that ID.")
+        if not deleted:
+            return await interaction.response.send_message("No reminder for you was found with that ID.")
 
-            try:
-                await db.execute("DELETE FROM reminders WHERE id = ? AND user_id = ?", (id, interaction.user.id))
-                await db.commit()
-            except Exception as e:
-                logging.error(f"[Reminder Error] Failed to delete reminder with id {id} for user {interaction.user.name}({interaction.user.id}): {e}")
-                return await interaction.response.send_message(f"Error: Failed to remove reminder with ID: {id}.")
+        self.scheduler.discard(lambda reminder: reminder.id == id)
+        self.reminder_index.discard(interaction.user.id, lambda reminder_id, remind_at, reminder_about: reminder_id == id)
+        await self.reminders_changed(interaction.user.id)
 
         await interaction.response.send_message(f"Successfully removed reminder with ID: {id}.")
 
@@ -506,42 +627,42 @@ class Reminder(commands.Cog):
             color=discord.Color.default()
         )
         # Check if the user has any reminders in the database
-        async with aiosqlite.connect('database.db') as db:
-            cursor = await db.execute("SELECT 1 FROM reminders WHERE user_id = ? LIMIT 1", (interaction.user.id, ))
-            result = await cursor.fetchone()
-            
-            if result is None:
-                return await interaction.edit_original_response(content="You don't have any reminders to clear.")
-
-            else:
-                view.message = await interaction.followup.send(content=interaction.user.mention, embed=embed, view=view, wait=True)  # Send the confirmation message
-                await view.wait() # Wait for the confirmation view to finish
-                if view.value is None:
-                    embed.color = discord.Color.red()
-                    embed.title = "Timed Out"
-                    embed.description = f"~~{embed.description}~~" 
-                    return await interaction.edit_original_response(embed=embed, view=view)  # Edit the original response to indicate timeout
-
-                if view.value == False:
-                    embed.color = discord.Color.red()
-                    embed.title = "Action Canceled"
-                    embed.description = f"~~{embed.description}~~" 
-                    return await interaction.edit_original_response(embed=embed, view=view)  # Edit the original response to indicate cancellation
-                
-                embed.title = "Action Confirmed"
-                embed.color = discord.Color.green()
-                await interaction.edit_original_response(embed=embed, view=view)
-                try:
-                    # Delete all reminders for the user
-                    await db.execute("DELETE FROM reminders WHERE user_id = ?", (interaction.user.id, ))
-                    await db.commit()
+        result = await self.bot.db.fetchone("SELECT 1 FROM reminders WHERE user_id = ? LIMIT 1", (interaction.user.id, ))
+        
+        if result is None:
+            return await interaction.edit_original_response(content="You don't have any reminders to clear.")
+
+        # The pooled connection is not held while waiting for the user to confirm
+        view.message = await interaction.followup.send(content=interaction.user.mention, embed=embed, view=view, wait=True)  # Send the confirmation message
+        await view.wait() # Wait for the confirmation view to finish
+        if view.value is None:
+            embed.color = discord.Color.red()
+            embed.title = "Timed Out"
+            embed.description = f"~~{embed.description}~~" 
+            return await interaction.edit_original_response(embed=embed, view=view)  # Edit the original response to indicate timeout
+
+        if view.value == False:
+            embed.color = discord.Color.red()
+            embed.title = "Action Canceled"
+            embed.description = f"~~{embed.description}~~" 
+            return await interaction.edit_original_response(embed=embed, view=view)  # Edit the original response to indicate cancellation
+        
+        embed.title = "Action Confirmed"
+        embed.color = discord.Color.green()
+        await interaction.edit_original_response(embed=embed, view=view)
+        try:
+            # Delete all reminders for the user
+            await self.bot.db.execute("DELETE FROM reminders WHERE user_id = ?", (interaction.user.id, ))
+            self.scheduler.discard(lambda reminder: reminder.user_id == interaction.user.id)
+            self.reminder_index.discard(interaction.user.id)
+            await self.reminders_changed(interaction.user.id)
 
-                except Exception as e:
-                    logging.error(f"[Reminder Error] Failed to clear reminders for user {interaction.user}({interaction.user.id}): {e}")
-                    embed.title = "Action Failed"
-                    embed.description = "Error: Failed to clear your reminders."
-                    embed.color = discord.Color.red()
-                    return await interaction.edit_original_response(embed=embed, view=None)
+        except Exception as e:
+            logging.error(f"[Reminder Error] Failed to clear reminders for user {interaction.user}({interaction.user.id}): {e}")
+            embed.title = "Action Failed"
+            embed.description = "Error: Failed to clear your reminders."
+            embed.color = discord.Color.red()
+            return await interaction.edit_original_response(embed=embed, view=None)
 
         embed.description = "Successfully cleared your reminders."
         await interaction.edit_original_response(embed=embed, view=None)
@@ -554,9 +675,7 @@ class Reminder(commands.Cog):
         """View all your active reminders"""
         await interaction.response.defer()
         try:
-            async with aiosqlite.connect('database.db') as db:
-                cursor = await db.execute("SELECT id, remind_at, reminder_about FROM reminders WHERE user_id = ?", (interaction.user.id, ))
-                rows = await cursor.fetchall()
+            rows = await self.bot.db.fetchall("SELECT id, remind_at, reminder_about FROM reminders WHERE user_id = ?", (interaction.user.id, ))
 
         except Exception as e:
             logging.error(f"[Reminder Error] Error fetching reminders for user {interaction.user.name}({interaction.user.id}): {e}")
@@ -565,18 +684,17 @@ class Reminder(commands.Cog):
         if not rows:
             return await interaction.edit_original_response(content="You don't have any reminders to view.")
         
+        user_timezone = await get_user_timezone(self.bot, interaction.user) # Get the user's timezone
         entries = []
         for id, remind_at, reminder_about in rows:
             try:
                 remind_at = int(remind_at) # Ensure remind_at is an integer timestamp
-                user_timezone = await get_user_timezone(interaction.user) # Get the user's timezone
                 remind_at_datetime = datetime.fromtimestamp(remind_at, tz=pytz.UTC).astimezone(user_timezone) # Convert the timestamp to a datetime object in the user's timezone
                 entries.append(f"> ID: {id} - {discord.utils.format_dt(remind_at_datetime, 'R')} - About: **{reminder_about}**")
             except Exception as e:
                 logging.error(f"[Reminder Error] Failed to view reminder with id: {id}, time: {remind_at}: {e}")
             
         msg = "\n".join(entries)
-        user_timezone = await get_user_timezone(interaction.user) # Get the user's timezone
         utc_offset = format_utc_offset(user_timezone)
 
         if user_timezone == pytz.UTC:
@@ -592,13 +710,8 @@ class Reminder(commands.Cog):
     #======================
     async def timezone_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
         """Autocompletes timezone input"""
-        matches =  [
-            app_commands.Choice(name=tz, value=tz)
-            # Show timezones that match the current input and are less than 100 characters long
-            for tz in (pytz.all_timezones) if current.lower() in tz.lower() and len(tz) < 100
-        ]
         # Limit the number of options to 25 to avoid hitting Discord's limit
-        return matches[:25] 
+        return [app_commands.Choice(name=tz, value=tz) for tz in self.timezone_index.search(current, limit=25)]
         
     @reminder_group.command(name="timezone")
     @app_commands.describe(timezone="Your timezone (e.g., Africa/Cairo, America/New_York). Just type and it will autocomplete for you.")
@@ -608,30 +721,30 @@ class Reminder(commands.Cog):
         await interaction.response.defer()
         try:
             # Check if the timezone is valid
-            pytz.timezone(timezone)
+            tzinfo = get_timezone(timezone)
 
         except pytz.exceptions.UnknownTimeZoneError:
             logging.warning(f"[Reminder] Invalid timezone input: user={interaction.user.id}, timezone='{timezone}'")
             return await interaction.edit_original_response(
                 content="Invalid timezone. Use a valid timezone like `Europe/Helsinki` or `America/New_York`. Try the autocomplete!"
             )
-        utc_offset = format_utc_offset(pytz.timezone(timezone)) # Format the UTC offset
+        utc_offset = format_utc_offset(tzinfo) # Format the UTC offset
 
-        async with aiosqlite.connect('database.db') as db:
-            try:
-                # Insert or replace the user's timezone in the database
-                await db.execute(
-                    "INSERT OR REPLACE INTO user_timezones (user_id, timezone) VALUES (?, ?)",
-                    (interaction.user.id, timezone)
-                )
-                await db.commit()
-                logging.info(f"[Reminder] Set timezone for user {interaction.user.id}: {timezone}, {utc_offset} hours offset")
+        try:
+            # Insert or replace the user's timezone in the database
+            await self.bot.db.execute(
+                "INSERT OR REPLACE INTO user_timezones (user_id, timezone) VALUES (?, ?)",
+                (interaction.user.id, timezone)
+            )
+            self.bot.timezones.set(interaction.user.id, tzinfo) # Write through to the cache
+            await self.bot.invalidate_shared("timezones", interaction.user.id) # Evict the old timezone from the other processes of a cluster
+            logging.info(f"[Reminder] Set timezone for user {interaction.user.id}: {timezone}, {utc_offset} hours offset")
 
-            except Exception as e:
-                logging.error(f"[Reminder Error] Failed to set timezone for user {interaction.user.id}: {e}")
-                return await interaction.edit_original_response(
-                    content=f"An unexpected error occurred while setting timezone."
-                )
+        except Exception as e:
+            logging.error(f"[Reminder Error] Failed to set timezone for user {interaction.user.id}: {e}")
+            return await interaction.edit_original_response(
+                content=f"An unexpected error occurred while setting timezone."
+            )
 
         embed = discord.Embed(
             title="Timezone Set",
@@ -643,22 +756,7 @@ class Reminder(commands.Cog):
 
 
 
-# Register the cog with the bot and create the database tables if they don't exist
+# Register the cog with the bot (the tables are created by the migrations in utils/migrations.py)
 async def setup(bot: commands.Bot):
     """Registers the cog with the bot"""
-    async with aiosqlite.connect('database.db') as db:
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS reminders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            remind_at INTEGER NOT NULL,
-            reminder_about TEXT
-        )""")
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS user_timezones (
-            user_id INTEGER NOT NULL PRIMARY KEY,
-            timezone TEXT NOT NULL
-        )""")
-        await db.commit()  
-
     await bot.add_cog(Reminder(bot))
\ No newline at end of file
@@ -1,6 +1,7 @@
 import logging
-import aiosqlite, sqlite3
+import sqlite3
 from discord.ext import commands
+from utils.migrations import MIGRATION_TABLES
 
 
 # This cog contains owner-only commands to manage the SQLite database for the bot
@@ -14,7 +15,7 @@ class DBAdmin(commands.Cog):
     @commands.command(name="showdb")
     @commands.is_owner()
     async def show_db(self, ctx: commands.Context, name: str):
-        async with aiosqlite.connect('database.db') as db:
+        async with self.bot.db.acquire() as db:
             try:
                 # Fetch all rows from the specified table
                 cursor = await db.execute(f"SELECT * FROM {name}")
@@ -46,17 +47,19 @@ class DBAdmin(commands.Cog):
     @commands.command(name="deletedb")
     @commands.is_owner()
     async def delete_db(self, ctx: commands.Context, name: str):
-        async with aiosqlite.connect('database.db') as db:
-            try:
-                await db.execute(f"DROP TABLE {name}")
-                await db.commit()
-            
-            except Exception as e: 
-                logging.error(f"[DB Admin] Delete DB command - Error deleting table {name}: {e}")
-                return await ctx.reply(f"Error when deleting the table: {e}")
+        try:
+            await self.bot.db.execute(f"DROP TABLE {name}")
+        
+        except Exception as e: 
+            logging.error(f"[DB Admin] Delete DB command - Error deleting table {name}: {e}")
+            return await ctx.reply(f"Error when deleting the table: {e}")
 
-            await ctx.reply(f"Successfully deleted table {name}")
-            logging.info(f"[DB Admin] deleted table {name} using command.")
+        msg = f"Successfully deleted table {name}"
+        if name in MIGRATION_TABLES:
+            # The bot's own tables are recreated empty by the migrations at the next startup
+            msg += ", it will be recreated empty when the bot restarts."
+        await ctx.reply(msg)
+        logging.info(f"[DB Admin] deleted table {name} using command.")
 
     # This command creates a table in the database with the specified name and columns
     @commands.command(name="createdb")
@@ -81,25 +84,21 @@ class DBAdmin(commands.Cog):
 
         query += ")"
 
-        async with aiosqlite.connect('database.db') as db:
-            try:
-                await db.execute(query)
-                await db.commit()
-            
-            except Exception as e: 
-                return await ctx.reply(f"Error creating the table: {e}")
-            
-            await ctx.reply(f"Successfully created table {name} if it didn't exist.")
-            logging.info(f"[DB Admin] created table {name} using command with columns: {', '.join(columns)}.")
+        try:
+            await self.bot.db.execute(query)
+        
+        except Exception as e: 
+            return await ctx.reply(f"Error creating the table: {e}")
+        
+        await ctx.reply(f"Successfully created table {name} if it didn't exist.")
+        logging.info(f"[DB Admin] created table {name} using command with columns: {', '.join(columns)}.")
 
     @commands.command(name="renamecol")
     @commands.is_owner()
     async def rename_column(self, ctx: commands.Context, table_name: str, column_name: str, new_name: str):
         query = f"ALTER TABLE {table_name} RENAME COLUMN {column_name} TO {new_name}"
         try:
-            async with aiosqlite.connect('database.db') as db:
-                await db.execute(query)
-                await db.commit()
+            await self.bot.db.execute(query)
 
         except Exception as e: 
             return await ctx.reply(f"Error renaming column: {e}")
@@ -107,6 +106,17 @@ class DBAdmin(commands.Cog):
         await ctx.reply(f"Successfully renamed column {column_name} to {new_name} in table {table_name}")
         logging.info(f"[DB ADmin] renamed column {column_name} to {new_name} in table {table_name} using command.")
 
+    # This command shows the connection pool checkout statistics
+    @commands.command(name="dbstats")
+    @commands.is_owner()
+    async def db_stats(self, ctx: commands.Context):
+        stats = self.bot.db.stats()
+        await ctx.reply(
+            f"**Database pool:** {stats['available']}/{stats['pool_size']} connections free\n"
+            f"**Checkouts:** {stats['checkouts']}\n"
+            f"**Checkout wait:** avg {stats['avg_wait_ms']:.2f}ms, max {stats['max_wait_ms']:.2f}ms"
+        )
+
 # Register the cog with the bot
 async def setup(bot: commands.Bot):
     """Registers the cog with the bot"""
@@ -5,6 +5,47 @@ load_dotenv() # Load environment variables from .env file
 TOKEN = os.getenv("BOT_TOKEN") # Get the bot token from the environment variable
 # The RAWG API key for game data retrieval
 RAWG_API_KEY = os.getenv("RAWG_API_KEY") # Get the RAWG API key from the environment variable
+# The RAWG API endpoint, point it at a local stub server to test without the real API
+RAWG_BASE_URL = os.getenv("RAWG_BASE_URL", "https://api.rawg.io/api")
+# Where the Prometheus-style /metrics endpoint listens, set METRICS_PORT to 0 to disable it
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+def parse_shard_ids(value: str) -> list[int]:
+    """Parses shard IDs and ranges like '0-3,8' into a list of IDs"""
+    shard_ids = []
+    for part in value.split(","):
+        start, dash, end = part.strip().partition("-")
+        start, end = int(start), int(end if dash else start) # int() rejects an empty end, e.g. "0-"
+        if end < start:
+            raise ValueError(f"Shard range {part.strip()} is reversed")
+        shard_ids.extend(range(start, end + 1))
+    return shard_ids
+
+# Sharding: leave both unset to let Discord pick the shard count and run every shard in this process,
+# or set SHARD_COUNT (and optionally SHARD_IDS, e.g. "0-3") to run a fixed range of shards
+# discord.py only raises a bare ClientException for bad values, so stop with a clear message instead
+try:
+    SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+except ValueError:
+    raise SystemExit(f"SHARD_COUNT must be a number, got {os.getenv('SHARD_COUNT')!r}.")
+try:
+    SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS")) if os.getenv("SHARD_IDS") else None
+except ValueError:
+    raise SystemExit(f"SHARD_IDS must be shard IDs and ranges like '0-3,8', got {os.getenv('SHARD_IDS')!r}.")
+if SHARD_COUNT is not None and SHARD_COUNT < 1:
+    raise SystemExit(f"SHARD_COUNT must be at least 1, got {SHARD_COUNT}.")
+if SHARD_IDS is not None:
+    if SHARD_COUNT is None:
+        raise SystemExit("SHARD_IDS is set but SHARD_COUNT isn't, set SHARD_COUNT to the total number of shards.")
+    if any(not 0 <= shard_id < SHARD_COUNT for shard_id in SHARD_IDS):
+        raise SystemExit(f"SHARD_IDS must be between 0 and {SHARD_COUNT - 1} (SHARD_COUNT - 1), got {os.getenv('SHARD_IDS')}.")
+
+# Cluster mode: launcher.py runs CLUSTER_WORKERS processes (0 means one per CPU) and sets the rest for each of them
+CLUSTER_WORKERS = int(os.getenv("CLUSTER_WORKERS", "0"))
+CLUSTER_ID = int(os.getenv("CLUSTER_ID")) if os.getenv("CLUSTER_ID") else None # None when running main.py on its own
+CLUSTER_IPC_PORT = int(os.getenv("CLUSTER_IPC_PORT", "0")) # The launcher's IPC hub on 127.0.0.1, 0 picks a free port
+CLUSTER_IPC_SECRET = os.getenv("CLUSTER_IPC_SECRET", "") # Generated by the launcher if unset
 
 # The GIF list for the kys command
 kys_gif_list = [
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import time
+import aiohttp
+from config import TOKEN, METRICS_PORT, SHARD_COUNT, CLUSTER_WORKERS, CLUSTER_IPC_PORT, CLUSTER_IPC_SECRET # Import the cluster settings from config.py
+from utils.ipc import IPCHub # Import the hub relaying messages between the workers
+from utils.logs import setup_logging # Import the queued logging setup
+
+# Runs the bot as a cluster: one main.py worker process per contiguous range of shards,
+# restarted by the supervisor below whenever it crashes
+log_listener, log_handler = setup_logging("launcher.log")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+IDENTIFY_DELAY = 5 # Discord allows one shard to identify every 5 seconds per concurrency bucket
+RESTART_DELAY = 5 # Seconds before restarting a crashed worker, doubled after each crash in a row
+MAX_RESTART_DELAY = 300
+STABLE_AFTER = 600 # A worker that ran this long before crashing restarts with the initial delay again
+SHUTDOWN_TIMEOUT = 30 # Seconds a worker gets to close cleanly before it is killed
+
+
+def split_shards(shard_count: int, workers: int) -> list[range]:
+    """Splits the shards into contiguous ranges of (almost) equal size, one per worker"""
+    return [range(i * shard_count // workers, (i + 1) * shard_count // workers) for i in range(workers)]
+
+
+async def fetch_gateway_info() -> tuple[int, int]:
+    """Returns the shard count Discord recommends and how many shards may identify at once"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get("https://discord.com/api/v10/gateway/bot", headers={"Authorization": f"Bot {TOKEN}"}) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+    return data["shards"], data["session_start_limit"]["max_concurrency"]
+
+
+class Worker:
+    """A main.py process running a range of shards, restarted by the supervisor when it crashes"""
+    def __init__(self, cluster_id: int, shards: range, shard_count: int, env: dict):
+        self.cluster_id = cluster_id
+        self.shards = shards
+        self.env = {
+            **env,
+            "CLUSTER_ID": str(cluster_id),
+            "SHARD_COUNT": str(shard_count),
+            "SHARD_IDS": f"{shards.start}-{shards.stop - 1}",
+            "METRICS_PORT": str(METRICS_PORT + cluster_id if METRICS_PORT else 0), # One /metrics endpoint per worker
+        }
+        self.process = None
+
+    async def supervise(self, stopping: asyncio.Event):
+        """Runs the worker until the cluster stops, restarting it with a backoff whenever it exits"""
+        failures = 0
+        while not stopping.is_set():
+            started = time.monotonic()
+            # In its own session (process group on Windows), so Ctrl+C in the terminal reaches only the launcher, which then stops the workers
+            if os.name == "nt":
+                self.process = await asyncio.create_subprocess_exec(sys.executable, "main.py", cwd=ROOT, env=self.env, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+            else:
+                self.process = await asyncio.create_subprocess_exec(sys.executable, "main.py", cwd=ROOT, env=self.env, start_new_session=True)
+            logging.info(f"[Launcher] Started cluster {self.cluster_id} (shards {self.env['SHARD_IDS']}) as PID {self.process.pid}.")
+            if stopping.is_set():
+                await self.stop() # The cluster started stopping while this worker was being spawned
+            code = await self.process.wait()
+            if stopping.is_set():
+                break
+
+            failures = 1 if time.monotonic() - started >= STABLE_AFTER else failures + 1
+            delay = min(RESTART_DELAY * 2 ** (failures - 1), MAX_RESTART_DELAY)
+            logging.error(f"[Launcher] Cluster {self.cluster_id} exited with code {code}, restarting it in {delay}s.")
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+        logging.info(f"[Launcher] Cluster {self.cluster_id} stopped.")
+
+    async def stop(self):
+        """Asks the worker to close cleanly, and kills it if it doesn't in time"""
+        if self.process is None or self.process.returncode is not None:
+            return
+        if os.name == "nt":
+            # Windows can't send SIGINT to another process, main.py handles CTRL_BREAK_EVENT like Ctrl+C instead
+            self.process.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            self.process.send_signal(signal.SIGINT) # bot.run closes the bot on KeyboardInterrupt
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logging.warning(f"[Launcher] Cluster {self.cluster_id} didn't stop in {SHUTDOWN_TIMEOUT}s, killing it.")
+            self.process.kill()
+            await self.process.wait()
+
+
+async def main():
+    max_concurrency = 1
+    shard_count = SHARD_COUNT
+    if shard_count is None:
+        shard_count, max_concurrency = await fetch_gateway_info()
+    workers = max(1, min(CLUSTER_WORKERS or os.cpu_count() or 1, shard_count))
+
+    # Workers connect to the hub to broadcast owner commands and cache invalidations to each other
+    hub = IPCHub(CLUSTER_IPC_SECRET or secrets.token_hex(16), port=CLUSTER_IPC_PORT)
+    await hub.start()
+    env = {**os.environ, "CLUSTER_IPC_PORT": str(hub.port), "CLUSTER_IPC_SECRET": hub.secret}
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            pass # Not supported on Windows, where Ctrl+C cancels main() instead and the finally below stops the workers
+
+    cluster = [Worker(cluster_id, shards, shard_count, env) for cluster_id, shards in enumerate(split_shards(shard_count, workers))]
+    print(f"Running {shard_count} shards in {workers} workers, IPC hub on port {hub.port}.")
+    logging.info(f"[Launcher] Running {shard_count} shards in {workers} workers: " + ", ".join(worker.env["SHARD_IDS"] for worker in cluster))
+
+    tasks = []
+    try:
+        for worker in cluster:
+            tasks.append(asyncio.create_task(worker.supervise(stopping)))
+            # Let the worker's shards identify before starting the next one, so the workers don't compete for identify slots
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=IDENTIFY_DELAY * len(worker.shards) / max_concurrency)
+            except asyncio.TimeoutError:
+                pass
+
+        await stopping.wait()
+    finally:
+        logging.info("[Launcher] Stopping the cluster.")
+        stopping.set()
+        await asyncio.gather(*(worker.stop() for worker in cluster))
+        await asyncio.gather(*tasks)
+        await hub.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log_listener.stop() # Flush the queued records
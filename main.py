@@ -1,61 +1,271 @@
 import discord
 import asyncio
 import logging
+import hashlib
+import json
+import os
+import re
+import signal
+import time
 from os import listdir
+from typing import Optional
+import aiohttp
+from discord import app_commands
 from discord.ext import commands
-from config import TOKEN # Import the bot's token from config.py
+from config import TOKEN, METRICS_HOST, METRICS_PORT, SHARD_COUNT, SHARD_IDS # Import the bot's token, metrics endpoint and shard settings from config.py
+from config import CLUSTER_ID, CLUSTER_IPC_PORT, CLUSTER_IPC_SECRET # Import the cluster settings set by launcher.py
 from cogs.general import generate_user_info_embed # Import the function to generate user info embed
 from cogs.prefixes import get_prefix # Import the get_prefix function to set the command prefix dynamically
+from utils.database import Database # Import the pooled database shared by all cogs
+from utils.migrations import run_migrations # Import the schema migrations that run at startup
+from utils.cache import LRUCache # Import the LRU cache used for per-guild prefixes
+from utils.profiles import UserProfileCache # Import the cache for fetched user profiles (banners)
+from utils.roles import RoleIndexes # Import the per-guild role indexes used by user info embeds
+from utils.logs import setup_logging # Import the queued logging setup
+from utils.metrics import MetricsRegistry, start_metrics_server # Import the metrics subsystem
+from utils.watchdog import LoopWatchdog # Import the event loop lag watchdog
+from utils.ipc import IPCClient # Import the IPC channel between the processes of a cluster
 
-# Setup logging to a file
-logging.basicConfig(
-    level=logging.INFO,
-    format='[%(asctime)s] [%(levelname)s] %(message)s', # Log format with timestamp and level
-    datefmt='%Y-%m-%d %H:%M:%S', # Date format for the timestamp
-    handlers= [
-        logging.FileHandler(filename='bot.log', encoding='utf-8', mode='a')
-    ]
-)
-handler = logging.FileHandler(filename='bot.log', encoding='utf-8', mode='a')
+# Setup logging to a rotating JSON file, written by a background thread so logging never blocks the event loop
+# Each process of a cluster gets its own file, since they can't share the rotation
+log_listener, log_handler = setup_logging("bot.log" if CLUSTER_ID is None else f"bot-{CLUSTER_ID}.log")
     
 # The bot's Discord activity
 activity = discord.Activity(name="my parents fight", type=discord.ActivityType.watching)
 
-class CooliBot(commands.Bot):
-    """Bot class that inherits from commands.Bot to use commands and cogs""" 
-    def __init__(self):
+class CooliTree(app_commands.CommandTree):
+    """Command tree that records the latency of slash commands and context menus"""
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras["started_at"] = time.perf_counter()
+        return True
+
+    def observe(self, interaction: discord.Interaction):
+        started_at = interaction.extras.get("started_at")
+        if started_at is not None and interaction.command is not None:
+            self.client.metrics.histogram(
+                "command_seconds", "Time taken to run commands", type="slash", command=interaction.command.qualified_name
+            ).observe(time.perf_counter() - started_at)
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        self.observe(interaction)
+        await super().on_error(interaction, error)
+
+class CooliBot(commands.AutoShardedBot):
+    """Bot class that inherits from commands.AutoShardedBot to use commands, cogs and shards""" 
+    # Kinds of guild messages cogs can register handlers for: messages that only mention the bot,
+    # and messages that are neither a mention nor a prefix command (e.g. autoreply candidates)
+    MESSAGE_KINDS = ("mention", "message")
+
+    def __init__(self, shard_count: Optional[int] = None, shard_ids: Optional[list[int]] = None):
         intents = discord.Intents.default()
         intents.message_content = True # Enable message content intent to read messages
-        super().__init__(intents=intents, command_prefix=get_prefix, activity=activity) 
+        super().__init__(
+            intents=intents, command_prefix=get_prefix, activity=activity, tree_cls=CooliTree, http_trace=self.http_trace(),
+            shard_count=shard_count, shard_ids=shard_ids # None lets Discord pick the count and runs every shard here
+        ) 
+        self.metrics = MetricsRegistry() # Latency histograms and gauges, served at /metrics
+        self.metrics_runner = None # The /metrics HTTP server
+        self.watchdog = None # Reports event loop stalls and what caused them
+        self.db = Database("database.db") # The bot-owned database connection pool
+        self.prefixes = LRUCache(max_size=10000) # Guild ID -> prefix cache used by get_prefix
+        self.timezones = LRUCache(max_size=10000) # User ID -> tzinfo cache used by get_user_timezone
+        self.profiles = UserProfileCache(self) # User ID -> fetched user cache shared by whois and banner commands
+        self.role_indexes = RoleIndexes() # Guild ID -> role order and permissions used by user info embeds
+        self.mention_pattern = None # Matches a message that only mentions the bot, compiled once the bot user is known
+        self.message_handlers = {kind: [] for kind in self.MESSAGE_KINDS} # Message kind -> handlers registered by cogs
+        # Connection to the other processes of a cluster, None when this process runs on its own
+        self.ipc = IPCClient(CLUSTER_ID, CLUSTER_IPC_SECRET, port=CLUSTER_IPC_PORT) if CLUSTER_ID is not None else None
+        # Caches other processes can evict keys from with invalidate_shared, cogs add their own
+        self.shared_caches = {"prefixes": self.prefixes, "timezones": self.timezones}
     
     async def setup_hook(self):
-        # Load all cogs from the cogs folder
-        cogs_count = 0
-        for filename in listdir("./cogs"):
-            if filename.endswith(".py"):
-                cogs_count += 1
-                await self.load_extension(f"cogs.{filename[:-3]}")
-                print(f"Loaded cog: {filename[:-3]}")
-                
-        print(f"Loaded {cogs_count} cogs.")
-
-        # Sync the command tree (application/slash commands)
-        synced = await self.tree.sync()
-        print(f"Synced {len(synced)} commands.")
+        timings = {} # Startup phase -> seconds
+        start = time.perf_counter()
+        self.mention_pattern = re.compile(rf"<@!?{self.user.id}>") # The bot user is known once setup_hook runs
+        if self.ipc:
+            self.ipc.handler("reload", self.on_ipc_reload)
+            self.ipc.handler("invalidate", self.on_ipc_invalidate)
+            self.ipc.start()
+
+        # Open the database connection pool before any cog needs it
+        await self.db.connect()
+        await run_migrations(self.db) # Bring the database schema up to date
+        timings["database"] = time.perf_counter() - start
+
+        # Load all cogs from the cogs folder concurrently
+        phase = time.perf_counter()
+        cogs = [filename[:-3] for filename in listdir("./cogs") if filename.endswith(".py")]
+        results = await asyncio.gather(*(self.load_extension(f"cogs.{cog}") for cog in cogs), return_exceptions=True)
+        failed = [cog for cog, result in zip(cogs, results) if isinstance(result, BaseException)]
+        for cog, result in zip(cogs, results):
+            if isinstance(result, BaseException):
+                logging.error(f"[Startup] Failed to load cog {cog}: {result!r}")
+            else:
+                print(f"Loaded cog: {cog}")
+        print(f"Loaded {len(cogs) - len(failed)}/{len(cogs)} cogs.")
+        timings["cogs"] = time.perf_counter() - phase
+
+        # Sync the command tree (application/slash commands) only if the commands changed since the last sync
+        # Application commands are global, so only the primary process of a cluster syncs them
+        phase = time.perf_counter()
+        tree_hash = self.command_tree_hash()
+        row = await self.db.fetchone("SELECT value FROM bot_state WHERE key = 'tree_hash'")
+        if not self.is_primary:
+            print("Not the primary process of the cluster, skipped syncing.")
+        elif failed:
+            # Syncing now would remove the failed cogs' slash commands for everyone, and store the incomplete tree's hash
+            logging.error(f"[Startup] Withheld syncing the command tree because some cogs failed to load: {', '.join(failed)}")
+        elif row and row[0] == tree_hash:
+            print("Command tree unchanged, skipped syncing.")
+        else:
+            synced = await self.tree.sync()
+            await self.save_tree_hash(tree_hash)
+            print(f"Synced {len(synced)} commands.")
+        timings["sync"] = time.perf_counter() - phase
+
+        # Start collecting the bot-wide metrics and serve them locally
+        self.metrics.register_histogram("db_query_seconds", "Time taken by database queries, pool checkout included", self.db.query_latency)
+        self.metrics.gauge("discord_gateway_latency_seconds", "Websocket heartbeat latency", lambda: self.latency if self.latency == self.latency else None) # NaN before the first heartbeat
+        self.metrics.gauge("discord_guilds", "Number of guilds the bot is in", lambda: len(self.guilds))
+        self.watchdog = LoopWatchdog(threshold=0.25, histogram=self.metrics.histogram("event_loop_lag_seconds", "How late the event loop wakes up from a sleep"))
+        self.watchdog.start()
+        self.metrics.gauge("event_loop_stalls", "Event loop stalls longer than the watchdog threshold", lambda: self.watchdog.stalls)
+        if METRICS_PORT:
+            try:
+                self.metrics_runner = await start_metrics_server(self.metrics, METRICS_HOST, METRICS_PORT)
+                logging.info(f"[Metrics] Serving metrics at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+            except OSError as e:
+                logging.error(f"[Metrics] Failed to start the metrics server on {METRICS_HOST}:{METRICS_PORT}: {e}")
+
+        timings["total"] = time.perf_counter() - start
+        logging.info("[Startup] " + ", ".join(f"{name}: {seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+
+    def command_tree_hash(self) -> str:
+        """Returns a fingerprint of the global application commands as Discord would receive them"""
+        payload = [command.to_dict(self.tree) for command in self.tree.get_commands()]
+        payload.sort(key=lambda command: (command.get("type", 1), command["name"]))
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    async def save_tree_hash(self, tree_hash: str):
+        """Remembers the fingerprint of the last synced command tree"""
+        await self.db.execute("INSERT OR REPLACE INTO bot_state (key, value) VALUES ('tree_hash', ?)", (tree_hash, ))
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether the guild belongs to one of the shards this process runs"""
+        if self.shard_ids is None:
+            return True # Every shard runs in this process
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+    @property
+    def is_primary(self) -> bool:
+        """Whether this process does the work that isn't tied to a guild, like reminders; the process running shard 0 does"""
+        return self.shard_ids is None or 0 in self.shard_ids
+
+    async def broadcast(self, op: str, **data):
+        """Sends an op to the other processes of the cluster, does nothing when this process runs on its own"""
+        if self.ipc:
+            await self.ipc.broadcast(op, **data)
+
+    async def invalidate_shared(self, cache: str, key):
+        """Evicts a key of one of the shared caches in the other processes of the cluster, after it changed here"""
+        await self.broadcast("invalidate", cache=cache, key=key)
+
+    async def on_ipc_invalidate(self, data: dict):
+        cache = self.shared_caches.get(data["cache"])
+        if cache is not None:
+            cache.pop(data["key"])
+
+    async def on_ipc_reload(self, data: dict):
+        # Another process of the cluster reloaded a cog with the reload command
+        try:
+            await self.reload_extension(f"cogs.{data['cog']}")
+            logging.info(f"[IPC] Reloaded cog {data['cog']} as requested by another process.")
+        except commands.ExtensionError as e:
+            logging.error(f"[IPC] Failed to reload cog {data['cog']} as requested by another process: {e}")
+
+    def http_trace(self) -> aiohttp.TraceConfig:
+        """Returns an aiohttp trace config that records the latency of Discord REST requests"""
+        async def on_request_start(session, context, params):
+            context.started_at = time.perf_counter()
+
+        async def on_request_end(session, context, params):
+            self.metrics.histogram(
+                "discord_http_seconds", "Time taken by Discord REST requests", method=params.method
+            ).observe(time.perf_counter() - context.started_at)
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_end)
+        return trace
+
+    async def invoke(self, ctx: commands.Context):
+        # Record the latency of prefix commands (slash commands are recorded by CooliTree)
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            if ctx.command is not None:
+                self.metrics.histogram(
+                    "command_seconds", "Time taken to run commands", type="prefix", command=ctx.command.qualified_name
+                ).observe(time.perf_counter() - start)
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self.tree.observe(interaction)
+
+    async def close(self):
+        # Close the database connection pool when the bot shuts down
+        await super().close()
+        await self.db.close()
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        if self.ipc:
+            await self.ipc.close()
 
     async def on_ready(self):
         # Fired when the bot is ready and connected to Discord
         print(f"Logged in as {self.user} (ID: {self.user.id})")
         print("------")
 
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        # Fetch the profile again next time, the cached banner may be outdated
+        self.profiles.invalidate(after.id)
+
+    def register_message_handler(self, kind: str, handler):
+        """Registers a coroutine function called with each guild message of the given kind"""
+        if kind not in self.MESSAGE_KINDS:
+            raise ValueError(f"Unknown message kind: {kind}")
+        self.message_handlers[kind].append(handler)
+
+    def unregister_message_handler(self, kind: str, handler):
+        """Removes a handler registered with register_message_handler"""
+        if handler in self.message_handlers[kind]:
+            self.message_handlers[kind].remove(handler)
+
     async def on_message(self, message: discord.Message):  
-        # Ignore messages from the bot itself
-        if message.author == self.user:
+        # Ignore messages from bots (including this one) and messages not sent in a guild
+        if message.author.bot or not message.guild:
             return
 
-        # Process prefix commands in guilds only
-        if message.guild:
-            await self.process_commands(message)
+        # Route each message to exactly one kind of handling
+        if self.mention_pattern.fullmatch(message.content):
+            kind = "mention"
+        elif message.content.startswith(await get_prefix(self, message)): # The prefix is cached, so this needs no I/O
+            return await self.process_commands(message)
+        else:
+            kind = "message"
+
+        for handler in self.message_handlers[kind]:
+            start = time.perf_counter()
+            try:
+                await handler(message)
+            except Exception as e:
+                logging.error(f"[Messages] {kind} handler {handler.__qualname__} failed for message {message.id}: {e!r}")
+            self.metrics.histogram(
+                "message_handler_seconds", "Time taken by on_message handlers", handler=handler.__qualname__
+            ).observe(time.perf_counter() - start)
     
     async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
         # Ignore unknown command errors
@@ -77,7 +287,7 @@ class CooliBot(commands.Bot):
         
 
 # Create an instance of the bot class        
-bot = CooliBot()    
+bot = CooliBot(shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)    
 
 #================
 # Owner-only command to reload a specific cog
@@ -88,6 +298,7 @@ async def reload(ctx: commands.Context, cog: str):
     """Reloads a cog from the cogs folder."""
     try:
         await ctx.bot.reload_extension(f"cogs.{cog}")
+        await ctx.bot.broadcast("reload", cog=cog) # Reload it in the other processes of the cluster too
         msg = await ctx.send(f"🔁 Reloaded `cogs.{cog}` successfully.")
         logging.info(f"Cog {cog} was reloaded using the command.")
 
@@ -116,12 +327,97 @@ async def reload(ctx: commands.Context, cog: str):
 async def sync(ctx: commands.Context):
     msg = await ctx.reply("Syncing command tree...")
     synced = await bot.tree.sync()
+    await bot.save_tree_hash(bot.command_tree_hash())
     await msg.edit(content=f"Synced {len(synced)} commands.")
     logging.info(f"Synced command tree using the command. Synced {len(synced)} Commands")
     await asyncio.sleep(5)
     await msg.delete()
     await ctx.message.delete()  
 
+#==============
+# Owner-only command to show a summary of the bot's metrics
+#==============
+@bot.command(name="metrics")
+@commands.is_owner()
+async def metrics(ctx: commands.Context):
+    """Shows the latency histograms and gauges collected by the bot."""
+    lines = []
+    # Slowest series first, so the interesting ones fit in the message
+    for name, labels, summary in sorted(bot.metrics.summaries(), key=lambda item: item[2]["p95_ms"], reverse=True):
+        label_str = ", ".join(f"{value}" for value in labels.values())
+        lines.append(
+            f"`{name}{f' ({label_str})' if label_str else ''}`: {summary['count']}x, "
+            f"avg {summary['avg_ms']:.1f}ms, p95 {summary['p95_ms']:.1f}ms, max {summary['max_ms']:.1f}ms"
+        )
+    for name, value in bot.metrics.gauge_values().items():
+        lines.append(f"`{name}`: {value:g}")
+
+    msg = "\n".join(lines) or "No metrics collected yet."
+    await ctx.reply(msg[:2000])
+
+#==============
+# Owner-only command to show the latest event loop stalls, or the stack of one of them
+#==============
+@bot.command(name="lagreport")
+@commands.is_owner()
+async def lagreport(ctx: commands.Context, index: Optional[int] = None):
+    """Shows the latest event loop stalls, or the stack captured for one of them."""
+    reports = list(reversed(bot.watchdog.reports)) if bot.watchdog else [] # Newest first
+    if not reports:
+        return await ctx.reply("No event loop stalls recorded.")
+
+    if index is not None:
+        if not 1 <= index <= len(reports):
+            return await ctx.reply(f"Pick a report between 1 and {len(reports)}.")
+        report = reports[index - 1]
+        # Keep the innermost frames, they are the ones that matter
+        return await ctx.reply(f"```\n{report.stack[-1900:]}\n```")
+
+    lines = [f"**Event loop stalls:** {bot.watchdog.stalls} over {bot.watchdog.threshold * 1000:.0f}ms"]
+    for number, report in enumerate(reports[:10], 1):
+        attribution = " / ".join(part for part in (report.cog, report.command) if part) or "no cog"
+        lines.append(
+            f"`{number}.` <t:{int(report.at)}:R> **{report.duration * 1000:.0f}ms** in {attribution} at `{report.location}`"
+        )
+    await ctx.reply("\n".join(lines))
+
+#==============
+# Owner-only command to show the bot's cache statistics
+#==============
+@bot.command(name="cachestats")
+@commands.is_owner()
+async def cachestats(ctx: commands.Context):
+    """Shows the hit/miss counters of the bot's caches."""
+    caches = {
+        "Prefixes": bot.prefixes,
+        "Timezones": bot.timezones,
+        "User profiles": bot.profiles.profiles,
+    }
+    autoreply = bot.get_cog("autoreply")
+    if autoreply:
+        caches["Autoreplies"] = autoreply.guild_replies
+    games = bot.get_cog("Games")
+    if games:
+        caches["RAWG titles"] = games.game_cache.titles
+        caches["RAWG games"] = games.game_cache.games
+    lines = []
+    for name, cache in caches.items():
+        stats = cache.stats()
+        lines.append(
+            f"**{name}:** {stats['size']}/{stats['max_size']} entries, "
+            f"{stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%}), {stats['evictions']} evictions"
+        )
+    await ctx.reply("\n".join(lines))
+
+#==============
+# Owner-only command to show the logging queue statistics
+#==============
+@bot.command(name="logstats")
+@commands.is_owner()
+async def logstats(ctx: commands.Context):
+    log_queue = log_handler.queue
+    await ctx.reply(f"**Log queue:** {log_queue.qsize()}/{log_queue.maxsize} records queued, {log_handler.dropped} dropped")
+
 #================================
 # USER INFO CONTEXT MENU COMMAND
 #================================
@@ -163,7 +459,7 @@ async def show_banner(interaction: discord.Interaction, member: discord.Member):
     """Shows a member's banner"""
     await interaction.response.defer()
     try: 
-        user = await bot.fetch_user(member.id) # Fetch the user object from the API to access the banner
+        user = await bot.profiles.fetch(member.id) # Get the full user object (cached) to access the banner
 
         if not user.banner:
             return await interaction.edit_original_response(content="That member doesn't have a banner.")
@@ -193,5 +489,12 @@ class MyHelpCommand(commands.MinimalHelpCommand):
 bot.help_command = MyHelpCommand()
 
 
-# Run the bot with the provided token and log handler
-bot.run(TOKEN, log_handler=handler)     
\ No newline at end of file
+# The launcher stops workers with CTRL_BREAK_EVENT on Windows, handle it like Ctrl+C so the bot closes cleanly
+if os.name == "nt" and CLUSTER_ID is not None:
+    signal.signal(signal.SIGBREAK, signal.default_int_handler)
+
+# Run the bot with the provided token, discord.py's logs go through the root logger's queue handler
+try:
+    bot.run(TOKEN, log_handler=None)
+finally:
+    log_listener.stop() # Flush the queued records     
\ No newline at end of file
@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterator, Optional
+
+
+class LRUCache:
+    """A bounded mapping that evicts the least recently used entries first"""
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._data: OrderedDict = OrderedDict()
+        # Lookup statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value for the key and marks it as recently used"""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value for the key without touching its recency or the counters"""
+        return self._data.get(key, default)
+
+    def set(self, key: Hashable, value: Any):
+        """Stores a value, evicting the least recently used entry if the cache is full"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Removes a key from the cache and returns its value"""
+        return self._data.pop(key, default)
+
+    def clear(self):
+        """Removes every entry from the cache"""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator:
+        return iter(list(self._data))
+
+    def stats(self) -> dict:
+        """Returns the size and hit/miss counters of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+class TTLCache(LRUCache):
+    """An LRU cache whose entries expire after a time to live, and can still be served for a while once stale"""
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0, stale_ttl: float = 0.0):
+        super().__init__(max_size)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl # How long after expiring an entry can still be served while it is refreshed
+
+    def lookup(self, key: Hashable) -> Optional[tuple[Any, bool]]:
+        """Returns (value, is_stale) for the key, or None if it is missing or too old to serve"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, stored_at = entry
+        age = time.time() - stored_at
+        if age > self.ttl + self.stale_ttl:
+            del self._data[key] # Expired for good
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value, age > self.ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value for the key if it is still fresh"""
+        entry = self.lookup(key)
+        return entry[0] if entry is not None and not entry[1] else default
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value for the key, fresh or not, without touching its recency or the counters"""
+        entry = self._data.get(key)
+        return entry[0] if entry is not None else default
+
+    def set(self, key: Hashable, value: Any, stored_at: Optional[float] = None):
+        """Stores a value, stored_at (a Unix timestamp) defaults to now"""
+        super().set(key, (value, time.time() if stored_at is None else stored_at))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Removes a key from the cache and returns its value"""
+        entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else default
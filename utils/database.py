@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+import aiosqlite
+from contextlib import asynccontextmanager
+from typing import Any, Iterable, Optional
+from utils.metrics import Histogram
+
+
+class Database:
+    """A small pool of long-lived SQLite connections shared by the whole bot"""
+    def __init__(self, path: str = "database.db", pool_size: int = 4, journal_mode: str = "WAL", slow_wait: float = 0.1):
+        self.path = path
+        self.pool_size = pool_size
+        self.journal_mode = journal_mode
+        self.slow_wait = slow_wait # Checkout waits longer than this (in seconds) are logged as warnings
+        self._pool: asyncio.Queue = asyncio.Queue()
+        self._connections: list[aiosqlite.Connection] = []
+        # Pool checkout statistics
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.query_latency = Histogram() # Time taken by the query helpers, checkout included
+
+    async def connect(self):
+        """Opens the pooled connections and configures them"""
+        if self._connections:
+            return # Already connected
+
+        for _ in range(self.pool_size):
+            db = await aiosqlite.connect(self.path, timeout=10)
+            await db.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            await db.execute("PRAGMA synchronous=NORMAL") # Safe with WAL and much faster than FULL
+            await db.execute("PRAGMA foreign_keys=ON")
+            self._connections.append(db)
+            self._pool.put_nowait(db)
+
+        logging.info(f"[Database] Opened {self.pool_size} connections to {self.path} (journal_mode={self.journal_mode})")
+
+    async def close(self):
+        """Closes every pooled connection"""
+        for db in self._connections:
+            try:
+                await db.close()
+            except Exception as e:
+                logging.error(f"[Database] Failed to close a connection: {e}")
+
+        self._connections.clear()
+        self._pool = asyncio.Queue()
+        logging.info(f"[Database] Closed the connection pool for {self.path}")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Checks a connection out of the pool for the duration of the block"""
+        start = time.perf_counter()
+        db = await self._pool.get()
+        wait = time.perf_counter() - start
+        # Record how long we waited for a free connection
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        if wait > self.slow_wait:
+            logging.warning(f"[Database] Waited {wait * 1000:.1f}ms for a pooled connection ({self.pool_size} connections)")
+
+        try:
+            yield db
+        finally:
+            self._pool.put_nowait(db)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Checks out a connection and commits on success or rolls back on error"""
+        async with self.acquire() as db:
+            try:
+                yield db
+                await db.commit()
+            except BaseException:
+                # Cancellation too, so the connection never goes back to the pool with a transaction (and the write lock) open.
+                # Shielded so a second cancel can't interrupt it; aiosqlite runs it before any later statement on the connection
+                await asyncio.shield(db.rollback())
+                raise
+
+    async def execute(self, query: str, params: Iterable[Any] = ()) -> int:
+        """Runs a write query, commits it and returns the number of affected rows"""
+        start = time.perf_counter()
+        try:
+            async with self.transaction() as db:
+                cursor = await db.execute(query, params)
+                rowcount = cursor.rowcount
+                await cursor.close()
+            return rowcount
+        finally:
+            self.query_latency.observe(time.perf_counter() - start)
+
+    async def executemany(self, query: str, params: Iterable[Iterable[Any]]) -> int:
+        """Runs a write query for every parameter set in one transaction"""
+        start = time.perf_counter()
+        try:
+            async with self.transaction() as db:
+                cursor = await db.executemany(query, params)
+                rowcount = cursor.rowcount
+                await cursor.close()
+            return rowcount
+        finally:
+            self.query_latency.observe(time.perf_counter() - start)
+
+    async def insert(self, query: str, params: Iterable[Any] = ()) -> int:
+        """Runs an INSERT query, commits it and returns the new row ID"""
+        start = time.perf_counter()
+        try:
+            async with self.transaction() as db:
+                cursor = await db.execute(query, params)
+                row_id = cursor.lastrowid
+                await cursor.close()
+            return row_id
+        finally:
+            self.query_latency.observe(time.perf_counter() - start)
+
+    async def fetchone(self, query: str, params: Iterable[Any] = ()) -> Optional[tuple]:
+        """Runs a read query and returns the first row"""
+        start = time.perf_counter()
+        try:
+            async with self.acquire() as db:
+                async with db.execute(query, params) as cursor:
+                    return await cursor.fetchone()
+        finally:
+            self.query_latency.observe(time.perf_counter() - start)
+
+    async def fetchall(self, query: str, params: Iterable[Any] = ()) -> list[tuple]:
+        """Runs a read query and returns all rows"""
+        start = time.perf_counter()
+        try:
+            async with self.acquire() as db:
+                async with db.execute(query, params) as cursor:
+                    return await cursor.fetchall()
+        finally:
+            self.query_latency.observe(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        """Returns the pool checkout statistics"""
+        return {
+            "pool_size": self.pool_size,
+            "available": self._pool.qsize(),
+            "checkouts": self.checkouts,
+            "avg_wait_ms": (self.total_wait / self.checkouts * 1000) if self.checkouts else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
@@ -0,0 +1,126 @@
+import asyncio
+import hmac
+import json
+import logging
+from typing import Awaitable, Callable, Optional
+
+# Messages are JSON objects, one per line: {"op": "...", "cluster": <sender ID>, "data": {...}}.
+# Every worker connects to the hub in the launcher, and the hub relays each message to every other worker.
+MAX_MESSAGE_SIZE = 64 * 1024
+
+
+class IPCHub:
+    """Relays broadcast messages between the worker processes of a cluster"""
+    def __init__(self, secret: str, host: str = "127.0.0.1", port: int = 0):
+        self.secret = secret # Workers have to send this first, so other local processes can't inject messages
+        self.host = host
+        self.port = port # 0 picks a free port, read it back after start()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: dict[int, asyncio.StreamWriter] = {} # Cluster ID -> connection
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_MESSAGE_SIZE)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        cluster_id = None
+        try:
+            hello = json.loads(await reader.readline())
+            if not hmac.compare_digest(str(hello.get("secret", "")), self.secret):
+                logging.warning("[IPC] Rejected a connection with a wrong secret.")
+                return
+            cluster_id = int(hello["cluster"])
+            self._writers[cluster_id] = writer
+            logging.info(f"[IPC] Cluster {cluster_id} connected.")
+
+            while line := await reader.readline():
+                for other_id, other in list(self._writers.items()):
+                    if other_id != cluster_id:
+                        other.write(line)
+                await asyncio.gather(*(other.drain() for other in self._writers.values()), return_exceptions=True)
+
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, KeyError) as e:
+            logging.warning(f"[IPC] Connection of cluster {cluster_id} failed: {e!r}")
+        finally:
+            if cluster_id is not None and self._writers.get(cluster_id) is writer:
+                del self._writers[cluster_id]
+                logging.info(f"[IPC] Cluster {cluster_id} disconnected.")
+            writer.close()
+
+
+class IPCClient:
+    """A worker's connection to the cluster hub, for broadcasting to and hearing from the other workers"""
+    def __init__(self, cluster_id: int, secret: str, host: str = "127.0.0.1", port: int = 0, retry_delay: float = 5.0):
+        self.cluster_id = cluster_id
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.retry_delay = retry_delay
+        self._handlers: dict[str, Callable[[dict], Awaitable[None]]] = {} # Op -> handler
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def handler(self, op: str, handler: Callable[[dict], Awaitable[None]]):
+        """Registers the coroutine function that handles broadcasts of an op, replacing any previous one"""
+        self._handlers[op] = handler
+
+    def remove_handler(self, op: str, handler: Callable[[dict], Awaitable[None]]):
+        """Removes the handler of an op, if it is still the given one"""
+        if self._handlers.get(op) == handler:
+            del self._handlers[op]
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        if self._writer:
+            self._writer.close()
+
+    async def broadcast(self, op: str, **data):
+        """Sends a message to every other worker, dropped if the hub isn't connected"""
+        if self._writer is None:
+            logging.warning(f"[IPC] Not connected to the hub, dropped broadcast '{op}'.")
+            return
+        try:
+            self._writer.write(json.dumps({"op": op, "cluster": self.cluster_id, "data": data}).encode() + b"\n")
+            await self._writer.drain()
+        except ConnectionError as e:
+            logging.warning(f"[IPC] Failed to send broadcast '{op}': {e!r}")
+
+    async def _run(self):
+        """Connects to the hub and dispatches the messages it relays, reconnecting when the connection drops"""
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port, limit=MAX_MESSAGE_SIZE)
+                writer.write(json.dumps({"cluster": self.cluster_id, "secret": self.secret}).encode() + b"\n")
+                await writer.drain()
+                self._writer = writer
+                logging.info(f"[IPC] Connected to the cluster hub on port {self.port}.")
+
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    handler = self._handlers.get(message.get("op"))
+                    if handler is None:
+                        continue
+                    try:
+                        await handler(message.get("data") or {})
+                    except Exception as e:
+                        logging.error(f"[IPC] Handler for '{message.get('op')}' from cluster {message.get('cluster')} failed: {e!r}")
+
+            except asyncio.CancelledError:
+                raise
+            except (ConnectionError, OSError, ValueError) as e:
+                logging.warning(f"[IPC] Lost the connection to the cluster hub: {e!r}")
+
+            self._writer = None
+            await asyncio.sleep(self.retry_delay)
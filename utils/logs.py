@@ -0,0 +1,95 @@
+import copy
+import json
+import logging
+import os
+import queue
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """A QueueHandler that drops records instead of blocking when the queue is full, and counts them"""
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merges the message arguments and traceback into the record so it can be formatted on the listener thread"""
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class DrainingQueueListener(QueueListener):
+    """A QueueListener whose stop() waits for room in a full queue, so every queued record is written first"""
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class SizedTimedRotatingFileHandler(RotatingFileHandler):
+    """Rotates the log file (bot.log -> bot.log.1 -> ...) once it grows past max_bytes or gets older than interval seconds"""
+    def __init__(self, filename: str, max_bytes: int, interval: float, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.interval = interval
+        # An existing file counts from its last write, so a restart doesn't restart the interval from zero
+        started = os.path.getmtime(filename) if os.path.exists(filename) and os.path.getsize(filename) else time.time()
+        self.rollover_at = started + interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(path: str = "bot.log", level: int = logging.INFO, json_format: bool = True, max_bytes: int = 10 * 1024 * 1024,
+                  interval: float = 86400, backup_count: int = 7, queue_size: int = 10000) -> tuple[DrainingQueueListener, DroppingQueueHandler]:
+    """Routes every log record through a bounded queue to a rotating file written by a background thread"""
+    file_handler = SizedTimedRotatingFileHandler(path, max_bytes=max_bytes, interval=interval, backup_count=backup_count)
+    if json_format:
+        file_handler.setFormatter(JSONFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = DrainingQueueListener(queue_handler.queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener, queue_handler
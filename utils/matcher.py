@@ -0,0 +1,54 @@
+from collections import deque
+from typing import Iterable
+
+
+class AhoCorasick:
+    """An Aho-Corasick automaton that finds every pattern contained in a text in one pass"""
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+        self._goto: list[dict] = [{}] # Trie transitions of each state
+        self._fail: list[int] = [0] # Failure link of each state
+        self._out: list[tuple] = [()] # Indexes of the patterns that end at each state
+
+        # Build the trie from the patterns
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue # Empty patterns would match everything
+
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] += (index, )
+
+        # Compute the failure links breadth first, merging the outputs of each failure state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail if fail != next_state else 0
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def search(self, text: str) -> set[int]:
+        """Returns the indexes of all patterns found in the text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
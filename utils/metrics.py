@@ -0,0 +1,132 @@
+from aiohttp import web
+from bisect import bisect_left
+
+
+class Histogram:
+    """Counts observations (in seconds) into buckets, like a Prometheus histogram"""
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1) # The last bucket counts everything above the largest bound
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Records one observation"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Returns the upper bound of the bucket that holds the q-th quantile"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """Returns the count, average, percentiles and maximum in milliseconds"""
+        return {
+            "count": self.count,
+            "avg_ms": (self.sum / self.count * 1000) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p95_ms": self.quantile(0.95) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+def _format_labels(labels: dict) -> str:
+    """Formats labels in the Prometheus text format, e.g. {command="game"}"""
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """Named histograms and gauges that can be rendered in the Prometheus text format"""
+    def __init__(self):
+        self._histograms = {} # Name -> (help, {label values: (labels, Histogram)})
+        self._gauges = {} # Name -> (help, function returning the value, or None to skip it)
+
+    def histogram(self, name: str, help: str, **labels) -> Histogram:
+        """Returns the histogram with this name and labels, creating it on first use"""
+        series = self._histograms.setdefault(name, (help, {}))[1]
+        key = tuple(labels.items())
+        if key not in series:
+            series[key] = (labels, Histogram())
+        return series[key][1]
+
+    def register_histogram(self, name: str, help: str, histogram: Histogram, **labels):
+        """Exposes a histogram that is owned elsewhere (e.g. by a client object)"""
+        self._histograms.setdefault(name, (help, {}))[1][tuple(labels.items())] = (labels, histogram)
+
+    def gauge(self, name: str, help: str, func):
+        """Exposes a value that is read when the metrics are collected"""
+        self._gauges[name] = (help, func)
+
+    def summaries(self) -> list[tuple[str, dict, dict]]:
+        """Returns (name, labels, summary) for every histogram with observations"""
+        return [
+            (name, labels, histogram.summary())
+            for name, (_, series) in self._histograms.items()
+            for labels, histogram in series.values() if histogram.count
+        ]
+
+    def gauge_values(self) -> dict:
+        """Returns the current value of every gauge"""
+        values = {}
+        for name, (_, func) in self._gauges.items():
+            try:
+                value = func()
+            except Exception:
+                value = None # A gauge whose source is gone (e.g. an unloaded cog) is skipped
+            if value is not None:
+                values[name] = value
+        return values
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format"""
+        lines = []
+        for name, (help, series) in self._histograms.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.values():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        values = self.gauge_values()
+        for name, (help, _) in self._gauges.items():
+            if name in values:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {values[name]}")
+        return "\n".join(lines) + "\n"
+
+
+async def start_metrics_server(registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9100) -> web.AppRunner:
+    """Serves the registry's metrics at http://host:port/metrics, returns the runner to clean up on shutdown"""
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
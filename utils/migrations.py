@@ -0,0 +1,101 @@
+import logging
+import re
+from utils.database import Database
+
+# Each migration is a (version, description, statements) tuple; they run in order and are never edited once released.
+# The schema version of the database is stored in SQLite's user_version pragma.
+# Statements must be idempotent (IF NOT EXISTS), every migration runs again when one of their tables is missing.
+MIGRATIONS = [
+    (1, "Create the base tables", [
+        """
+        CREATE TABLE IF NOT EXISTS prefixes (
+            guild_id INTEGER PRIMARY KEY,
+            prefix TEXT
+        )""",
+        """
+        CREATE TABLE IF NOT EXISTS autoreplies (
+            guild_id INTEGER NOT NULL,
+            trigger TEXT NOT NULL,
+            response TEXT NOT NULL,
+            PRIMARY KEY (guild_id, trigger)
+        )""",
+        """
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            remind_at INTEGER NOT NULL,
+            reminder_about TEXT
+        )""",
+        """
+        CREATE TABLE IF NOT EXISTS user_timezones (
+            user_id INTEGER NOT NULL PRIMARY KEY,
+            timezone TEXT NOT NULL
+        )""",
+    ]),
+    (2, "Add covering indexes for reminder lookups", [
+        # Used by the reminder scheduler, which reads reminders in due order
+        "CREATE INDEX IF NOT EXISTS idx_reminders_remind_at ON reminders (remind_at)",
+        # Used by the list, clear and duplicate checks, which look up the reminders of a user
+        "CREATE INDEX IF NOT EXISTS idx_reminders_user ON reminders (user_id, remind_at, reminder_about)",
+    ]),
+    (3, "Add the RAWG response cache", [
+        # kind is 'title' (normalized title -> slug) or 'game' (slug -> game record), values are JSON
+        """
+        CREATE TABLE IF NOT EXISTS rawg_cache (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            stored_at INTEGER NOT NULL,
+            PRIMARY KEY (kind, key)
+        )""",
+    ]),
+    (4, "Add a key-value table for bot state", [
+        # Small values the bot keeps between restarts, like the hash of the last synced command tree
+        """
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )""",
+    ]),
+]
+
+
+async def get_schema_version(db: Database) -> int:
+    """Returns the schema version of the database"""
+    row = await db.fetchone("PRAGMA user_version")
+    return row[0] if row else 0
+
+
+_CREATE_TABLE_RE = re.compile(r"CREATE TABLE IF NOT EXISTS (\w+)")
+MIGRATION_TABLES = {name for _, _, statements in MIGRATIONS for statement in statements for name in _CREATE_TABLE_RE.findall(statement)}
+
+
+async def get_missing_tables(db: Database) -> set[str]:
+    """Returns the tables created by the migrations that don't exist, e.g. after the deletedb command dropped one"""
+    rows = await db.fetchall("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return MIGRATION_TABLES - {name for (name, ) in rows}
+
+
+async def run_migrations(db: Database):
+    """Applies every migration newer than the database's schema version"""
+    version = await get_schema_version(db)
+    pending = [migration for migration in MIGRATIONS if migration[0] > version]
+    missing = await get_missing_tables(db) if not pending else set()
+    if missing:
+        # A table was dropped after its migration ran, run them all again to recreate it and its indexes
+        logging.warning(f"[Migrations] Tables {', '.join(sorted(missing))} are missing, recreating them.")
+        pending = MIGRATIONS
+    if not pending:
+        logging.info(f"[Migrations] Database schema is up to date (version {version}).")
+        return
+
+    # All pending migrations run in one transaction together with the version bump, so a failed startup leaves the schema untouched
+    async with db.transaction() as conn:
+        await conn.execute("BEGIN")
+        for migration_version, description, statements in pending:
+            for statement in statements:
+                await conn.execute(statement)
+        await conn.execute(f"PRAGMA user_version = {int(pending[-1][0])}")
+
+    for migration_version, description, statements in pending:
+        logging.info(f"[Migrations] Applied migration {migration_version}: {description}")
@@ -0,0 +1,27 @@
+import discord
+from utils.cache import TTLCache
+from utils.singleflight import SingleFlight
+
+
+class UserProfileCache:
+    """Caches full user profiles (fetched over REST, the only way to get banners) for a while"""
+    def __init__(self, client: discord.Client, max_size: int = 5000, ttl: float = 600.0):
+        self.client = client
+        self.profiles = TTLCache(max_size=max_size, ttl=ttl)
+        self.flights = SingleFlight() # Concurrent fetches of the same user share one request
+
+    async def fetch(self, user_id: int) -> discord.User:
+        """Returns the user's profile, fetching it from the API if it isn't cached or has expired"""
+        user = self.profiles.get(user_id)
+        if user is None:
+            user = await self.flights.do(user_id, lambda: self._fetch(user_id))
+        return user
+
+    async def _fetch(self, user_id: int) -> discord.User:
+        user = await self.client.fetch_user(user_id) # Raises NotFound for deleted users, which isn't cached
+        self.profiles.set(user_id, user)
+        return user
+
+    def invalidate(self, user_id: int):
+        """Forgets a cached profile, the next lookup fetches it again"""
+        self.profiles.pop(user_id)
@@ -0,0 +1,139 @@
+import asyncio
+import discord
+import logging
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+MAX_BULK_DELETE = 100 # Discord's limit of messages per bulk delete
+# Bulk delete only accepts messages younger than 14 days, keep a margin for the time the purge itself takes
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+# Filtered purges look through at most this many messages, so a rare match can't make them walk the whole channel history
+FILTERED_SCAN_LIMIT = 5000
+
+
+class PurgeProgress(NamedTuple):
+    """How far a purge has gotten"""
+    scanned: int
+    deleted: int
+    bulk_deleted: int
+    single_deleted: int
+    failed: int
+    done: bool
+
+
+class PurgeEngine:
+    """Deletes the messages of a channel that match a check, using bulk deletes where Discord allows them"""
+    # Requests are paced by discord.py's rate limit handling, which follows the rate limit headers of each route,
+    # so there are no fixed sleeps here; the concurrency only bounds how many requests are queued at once
+    def __init__(self, channel: discord.abc.Messageable, limit: int, check: Callable[[discord.Message], bool] = lambda message: True,
+                 before: Optional[discord.abc.Snowflake] = None, after: Optional[discord.abc.Snowflake] = None,
+                 exclude: set[int] = frozenset(), scan_limit: Optional[int] = None, single_concurrency: int = 3,
+                 progress: Optional[Callable[[PurgeProgress], Awaitable[None]]] = None, progress_interval: float = 2.0):
+        self.channel = channel
+        self.limit = limit # Number of matching messages to delete
+        self.check = check
+        self.before = before
+        self.after = after
+        self.exclude = exclude # Message IDs to never delete, like the command and progress messages
+        self.scan_limit = scan_limit # Number of messages to look through at most, None for no limit
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self._single_semaphore = asyncio.Semaphore(single_concurrency)
+        self._last_progress = 0.0
+        self.scanned = 0
+        self.bulk_deleted = 0
+        self.single_deleted = 0
+        self.failed = 0
+        self.matched = 0
+
+    @property
+    def deleted(self) -> int:
+        return self.bulk_deleted + self.single_deleted
+
+    @property
+    def hit_scan_limit(self) -> bool:
+        """Whether the purge stopped because it scanned scan_limit messages, before finding limit matching ones"""
+        return self.scan_limit is not None and self.scanned >= self.scan_limit and self.matched < self.limit
+
+    def snapshot(self, done: bool = False) -> PurgeProgress:
+        return PurgeProgress(self.scanned, self.deleted, self.bulk_deleted, self.single_deleted, self.failed, done)
+
+    async def _report(self, force: bool = False):
+        """Reports the progress, at most once per progress_interval unless forced"""
+        if self.progress is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        try:
+            await self.progress(self.snapshot(done=force))
+        except discord.HTTPException as e:
+            logging.warning(f"[Purge] Failed to report progress: {e}")
+
+    async def _bulk_delete(self, messages: list[discord.Message]):
+        try:
+            await self.channel.delete_messages(messages)
+            self.bulk_deleted += len(messages)
+        except discord.NotFound:
+            # One of the messages was already deleted, which fails the whole batch; delete them one by one
+            await asyncio.gather(*(self._single_delete(message) for message in messages))
+        await self._report()
+
+    async def _single_delete(self, message: discord.Message):
+        async with self._single_semaphore:
+            try:
+                await message.delete()
+                self.single_deleted += 1
+            except discord.NotFound:
+                pass # Already deleted
+            except discord.HTTPException as e:
+                self.failed += 1
+                logging.warning(f"[Purge] Failed to delete message {message.id} in channel {self.channel.id}: {e}")
+        await self._report()
+
+    async def run(self) -> PurgeProgress:
+        """Runs the purge and returns the final counts, stopping early on Forbidden"""
+        bulk_cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        batch: list[discord.Message] = []
+        bulk_task: Optional[asyncio.Task] = None
+        single_tasks: list[asyncio.Task] = []
+
+        try:
+            async for message in self.channel.history(limit=self.scan_limit, before=self.before, after=self.after):
+                self.scanned += 1
+                if message.id in self.exclude or not self.check(message):
+                    continue
+
+                self.matched += 1
+                if message.created_at < bulk_cutoff:
+                    # Too old for a bulk delete, delete it on its own alongside the scan
+                    single_tasks.append(asyncio.create_task(self._single_delete(message)))
+                else:
+                    batch.append(message)
+                    if len(batch) == MAX_BULK_DELETE:
+                        # Keep scanning the history while the previous batch is being deleted
+                        if bulk_task is not None:
+                            await bulk_task
+                        bulk_task = asyncio.create_task(self._bulk_delete(batch))
+                        batch = []
+
+                if self.matched >= self.limit:
+                    break
+
+            if bulk_task is not None:
+                await bulk_task
+            if batch:
+                await self._bulk_delete(batch)
+            await asyncio.gather(*single_tasks)
+
+        except BaseException:
+            # Don't leave deletes running in the background when the purge fails or is cancelled
+            for task in [bulk_task, *single_tasks]:
+                if task is not None and not task.done():
+                    task.cancel()
+            raise
+
+        await self._report(force=True)
+        return self.snapshot(done=True)
@@ -0,0 +1,26 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """An async token bucket that allows at most `rate` calls every `per` seconds"""
+    def __init__(self, rate: float, per: float = 1.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until a call is allowed"""
+        async with self._lock:
+            while True:
+                # Refill the tokens for the time that passed since the last call
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
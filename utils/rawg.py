@@ -0,0 +1,370 @@
+import asyncio
+import aiohttp
+import html
+import json
+import logging
+import re
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from itertools import islice
+from typing import NamedTuple, Optional
+from utils.cache import TTLCache
+from utils.metrics import Histogram
+from utils.singleflight import SingleFlight
+
+
+class RAWGError(Exception):
+    """Raised when the RAWG API answers with an error status"""
+    def __init__(self, status: int, path: str):
+        super().__init__(f"RAWG API returned status {status} for {path}")
+        self.status = status
+        self.path = path
+
+
+class RAWGClient:
+    """A client for the RAWG games API that reuses one pooled HTTP session"""
+    BASE_URL = "https://api.rawg.io/api"
+
+    def __init__(self, api_key: str, base_url: str = BASE_URL, timeout: float = 10.0, max_concurrency: int = 4,
+                 pool_size: int = 10, dns_ttl: int = 300):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=min(timeout, 5.0))
+        self.pool_size = pool_size
+        self.dns_ttl = dns_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency) # Caps the number of requests in flight at once
+        self.latency = Histogram()
+        self.errors = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Returns the shared session, creating it on first use (it has to be created inside the event loop)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size, # Keep-alive connections are reused up to this many
+                ttl_dns_cache=self.dns_ttl, # Cache DNS lookups for api.rawg.io
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        """Closes the session and its pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get(self, path: str, **params) -> dict:
+        """Sends a GET request to the API and returns the JSON response"""
+        params["key"] = self.api_key
+        session = self._get_session()
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                async with session.get(f"{self.base_url}{path}", params=params) as response:
+                    if response.status != 200:
+                        raise RAWGError(response.status, path)
+                    return await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError, RAWGError):
+                self.errors += 1
+                raise
+            finally:
+                self.latency.observe(time.perf_counter() - start)
+
+    async def search_games(self, title: str, page_size: int = 20) -> list:
+        """Searches games by title, best matches first"""
+        data = await self.get("/games", search=title, page_size=page_size)
+        return data.get("results") or []
+
+    async def get_game(self, slug: str) -> dict:
+        """Gets the details of a game by its slug or ID"""
+        return await self.get(f"/games/{slug}")
+
+    def stats(self) -> dict:
+        """Returns the request latency summary and error count"""
+        stats = self.latency.summary()
+        stats["errors"] = self.errors
+        return stats
+
+
+class GameRecord(NamedTuple):
+    """The parts of a RAWG game that /game shows, ready to put in an embed"""
+    slug: str
+    name: str
+    url: str
+    description: str
+    released: Optional[str] # YYYY-MM-DD
+    platforms: str
+    developers: str
+    publishers: str
+    genres: str
+    background_image: Optional[str]
+    rating: str
+    metacritic: str
+
+
+_HTML_TAG_RE = re.compile(r"<.*?>")
+
+def parse_game(game: dict, details: dict) -> GameRecord:
+    """Builds a game record from a search result and the game's details"""
+    slug = game["slug"]
+    text_desc = html.unescape(_HTML_TAG_RE.sub("", details.get("description") or "N/A")) # Remove HTML tags from the description
+    text_desc = text_desc[:1000] + "..." if len(text_desc) > 1000 else text_desc # Limit description to 1000 characters
+    return GameRecord(
+        slug=slug,
+        name=game["name"],
+        url=details.get("website") or f"https://rawg.io/games/{slug}", # Fall back to the rawg.io page
+        description=text_desc,
+        released=game.get("released"),
+        platforms=", ".join(p["platform"]["name"] for p in game.get("platforms") or []) or "N/A",
+        developers=", ".join(d["name"] for d in details.get("developers") or []) or "N/A",
+        publishers=", ".join(p["name"] for p in details.get("publishers") or []) or "N/A",
+        genres=", ".join(g["name"] for g in game.get("genres") or []) or "N/A",
+        background_image=game.get("background_image") or None,
+        rating=str(game.get("rating") or "N/A"),
+        metacritic=str(game.get("metacritic") or "N/A"),
+    )
+
+
+def normalize_title(title: str) -> str:
+    """Normalizes a title so different spellings of the same search share a cache entry"""
+    return " ".join(title.lower().split())
+
+
+def _trigrams(text: str) -> set:
+    """Returns the trigrams of a normalized title, padded so short words still have some"""
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class GameTitleIndex:
+    """A bounded local index of known game titles, matched by prefix and by trigram similarity"""
+    def __init__(self, max_titles: int = 20000, min_similarity: float = 0.5):
+        self.max_titles = max_titles
+        self.min_similarity = min_similarity # Share of the query's trigrams a title needs to match
+        self._titles = OrderedDict() # Normalized title -> display title, oldest first
+        self._sorted = [] # Sorted normalized titles, for prefix lookups
+        self._trigrams = {} # Trigram -> normalized titles that contain it
+
+    def add(self, title: str):
+        """Adds a title to the index, evicting the oldest title if the index is full"""
+        key = normalize_title(title)
+        if not key:
+            return
+        if key in self._titles:
+            self._titles.move_to_end(key)
+            return
+
+        self._titles[key] = title
+        insort(self._sorted, key)
+        for trigram in _trigrams(key):
+            self._trigrams.setdefault(trigram, set()).add(key)
+
+        while len(self._titles) > self.max_titles:
+            old, _ = self._titles.popitem(last=False)
+            del self._sorted[bisect_left(self._sorted, old)]
+            for trigram in _trigrams(old):
+                keys = self._trigrams[trigram]
+                keys.discard(old)
+                if not keys:
+                    del self._trigrams[trigram]
+
+    def search(self, query: str, limit: int = 25) -> list[str]:
+        """Returns display titles that start with the query, then titles similar to it"""
+        query = normalize_title(query)
+        if not query:
+            return [self._titles[key] for key in list(reversed(self._titles))[:limit]] # The most recent titles
+
+        results = []
+        start = bisect_left(self._sorted, query)
+        for key in islice(self._sorted, start, None):
+            if not key.startswith(query) or len(results) >= limit:
+                break
+            results.append(key)
+
+        if len(results) < limit and len(query) >= 3:
+            # Count the trigrams each title shares with the query
+            query_trigrams = _trigrams(query)
+            shared = {}
+            for trigram in query_trigrams:
+                for key in self._trigrams.get(trigram, ()):
+                    shared[key] = shared.get(key, 0) + 1
+
+            needed = self.min_similarity * len(query_trigrams)
+            seen = set(results)
+            similar = sorted(
+                (key for key, count in shared.items() if count >= needed and key not in seen),
+                key=lambda key: (-shared[key], len(key), key)
+            )
+            results.extend(similar[:limit - len(results)])
+
+        return [self._titles[key] for key in results]
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+
+class GameCache:
+    """A two-level cache in front of RAWG: normalized title -> slug and slug -> game record"""
+    # Entries are served while fresh, served and refreshed in the background while stale,
+    # and persisted to the rawg_cache table (when a database is given) so they survive restarts
+    def __init__(self, client: RAWGClient, db=None, title_ttl: float = 7 * 86400, game_ttl: float = 86400,
+                 stale_ttl: float = 86400, max_titles: int = 5000, max_games: int = 2000):
+        self.client = client
+        self.db = db
+        self.titles = TTLCache(max_size=max_titles, ttl=title_ttl, stale_ttl=stale_ttl)
+        self.games = TTLCache(max_size=max_games, ttl=game_ttl, stale_ttl=stale_ttl)
+        self.flights = SingleFlight() # Deduplicates concurrent upstream requests
+        self.index = GameTitleIndex() # Known titles, used by the autocomplete
+        self.searched = TTLCache(max_size=5000, ttl=title_ttl) # Autocomplete queries already searched upstream
+        self._latest_queries = {} # User ID -> token of their last autocomplete call, for debouncing
+        self._refreshing = set() # Titles with a background refresh in flight
+        self._tasks = set() # Keeps references to the refresh tasks so they aren't garbage collected
+
+    async def _load(self, kind: str, key: str, cache: TTLCache) -> Optional[tuple]:
+        """Looks an entry up in memory, then on disk, returns (value, is_stale) or None"""
+        entry = cache.lookup(key)
+        if entry is not None or self.db is None:
+            return entry
+
+        row = await self.db.fetchone("SELECT value, stored_at FROM rawg_cache WHERE kind = ? AND key = ?", (kind, key))
+        if not row:
+            return None
+        value = json.loads(row[0])
+        if kind == "game":
+            value = GameRecord(**value)
+        cache.set(key, value, stored_at=row[1])
+        return cache.lookup(key) # None if the row is too old to serve
+
+    async def _store(self, kind: str, key: str, value, cache: TTLCache):
+        """Stores an entry in memory and on disk"""
+        cache.set(key, value)
+        if self.db is None:
+            return
+        data = value._asdict() if isinstance(value, GameRecord) else value
+        try:
+            await self.db.execute(
+                "INSERT OR REPLACE INTO rawg_cache (kind, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                (kind, key, json.dumps(data), int(time.time()))
+            )
+        except Exception as e:
+            logging.error(f"[RAWG Error] Failed to persist cached {kind} '{key}': {e}")
+
+    async def fetch(self, title: str) -> Optional[GameRecord]:
+        """Searches RAWG for a title and caches the top result, returns None if nothing matched"""
+        # Concurrent lookups of the same title share one search
+        return await self.flights.do(("title", normalize_title(title)), lambda: self._fetch(title))
+
+    async def _fetch(self, title: str) -> Optional[GameRecord]:
+        results = await self.client.search_games(title)
+        if not results:
+            return None
+
+        for result in results:
+            self.index.add(result["name"])
+        game = results[0] # The top result
+        slug = game["slug"]
+        # Different titles can resolve to the same game, so the details request is shared by slug
+        details = await self.flights.do(("game", slug), lambda: self.client.get_game(slug))
+        record = parse_game(game, details)
+        await self._store("title", normalize_title(title), record.slug, self.titles)
+        await self._store("game", record.slug, record, self.games)
+        return record
+
+    async def get(self, title: str) -> Optional[GameRecord]:
+        """Returns the game record for a title, from the cache when possible"""
+        key = normalize_title(title)
+        slug_entry = await self._load("title", key, self.titles)
+        if slug_entry is None:
+            return await self.fetch(title)
+
+        slug, title_stale = slug_entry
+        game_entry = await self._load("game", slug, self.games)
+        if game_entry is None:
+            return await self.fetch(title)
+
+        record, game_stale = game_entry
+        if title_stale or game_stale:
+            self._refresh(title)
+        return record
+
+    def _refresh(self, title: str):
+        """Refreshes a stale title in the background, at most once at a time"""
+        key = normalize_title(title)
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self.fetch(title)
+            except Exception as e:
+                logging.warning(f"[RAWG] Failed to refresh stale entry for '{title}': {e!r}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def load_index(self):
+        """Fills the title index with the names of the persisted games"""
+        if self.db is None:
+            return
+        rows = await self.db.fetchall("SELECT value FROM rawg_cache WHERE kind = 'game' ORDER BY stored_at")
+        for (value, ) in rows:
+            self.index.add(json.loads(value)["name"])
+
+    async def suggest(self, query: str, user_id: int, limit: int = 25, min_local: int = 5,
+                      debounce: float = 0.3, timeout: float = 1.5) -> list[str]:
+        """Suggests titles for an autocomplete, only asking RAWG when the local index has too few"""
+        titles = self.index.search(query, limit)
+        key = normalize_title(query)
+        if len(titles) >= min_local or len(key) < 3 or self.searched.get(key):
+            return titles
+
+        # Debounce: wait for the user to stop typing, later keystrokes replace this query
+        token = object() # Identifies this call, the same text can be typed again by a later keystroke
+        self._latest_queries[user_id] = token
+        try:
+            await asyncio.sleep(debounce)
+        finally:
+            # Also clean up when discord.py cancels this autocomplete for a newer one, unless that one already took the slot
+            latest = self._latest_queries.get(user_id) is token
+            if latest:
+                del self._latest_queries[user_id]
+        if not latest:
+            return titles
+
+        try:
+            # Stay within the autocomplete deadline, the search keeps going in the background if it times out
+            results = await asyncio.wait_for(
+                asyncio.shield(self.flights.do(("search", key), lambda: self.client.search_games(query, page_size=10))),
+                timeout
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError, RAWGError) as e:
+            logging.warning(f"[RAWG] Autocomplete search for '{query}' failed: {e!r}")
+            return titles
+
+        self.searched.set(key, True)
+        for result in results:
+            self.index.add(result["name"])
+        return self.index.search(query, limit)
+
+    async def prune(self):
+        """Deletes persisted entries that are too old to be served"""
+        if self.db is None:
+            return
+        now = int(time.time())
+        deleted = await self.db.execute(
+            "DELETE FROM rawg_cache WHERE (kind = 'title' AND stored_at < ?) OR (kind = 'game' AND stored_at < ?)",
+            (now - self.titles.ttl - self.titles.stale_ttl, now - self.games.ttl - self.games.stale_ttl)
+        )
+        if deleted:
+            logging.info(f"[RAWG] Pruned {deleted} expired cache entries.")
+
+    async def close(self):
+        """Cancels the background refreshes"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
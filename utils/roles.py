@@ -0,0 +1,97 @@
+import discord
+from typing import Iterable
+from utils.cache import LRUCache
+
+# Permissions shown as "Key Permissions" in the user info embed, in display order
+MOD_PERMISSIONS = (
+    "administrator",
+    "ban_members",
+    "kick_members",
+    "manage_guild",
+    "manage_channels",
+    "manage_roles",
+    "manage_messages",
+    "manage_webhooks",
+    "view_audit_log",
+    "manage_events",
+    "manage_threads",
+    "moderate_members",
+    "manage_nicknames",
+    "mention_everyone",
+    "mute_members",
+    "deafen_members",
+    "move_members",
+    "manage_emojis_and_stickers",
+)
+MOD_PERMISSION_LABELS = [(discord.Permissions.VALID_FLAGS[perm], perm.replace("_", " ").title()) for perm in MOD_PERMISSIONS]
+MOD_PERMISSIONS_MASK = discord.Permissions(**{perm: True for perm in MOD_PERMISSIONS}).value
+ADMINISTRATOR = discord.Permissions.VALID_FLAGS["administrator"]
+ALL_PERMISSIONS = discord.Permissions.all().value
+TIMEOUT_MASK = discord.Permissions(view_channel=True, read_message_history=True).value # What timed out members keep
+
+
+def member_role_ids(member: discord.Member) -> Iterable[int]:
+    """Returns the member's role IDs without building and sorting Role objects like Member.roles does"""
+    # Member._roles is discord.py's raw role ID array (discord.py==2.5.2 in requirements.txt); it is internal,
+    # so fall back to the public Member.roles if a future version drops it
+    role_ids = getattr(member, "_roles", None)
+    if role_ids is None:
+        return [role.id for role in member.roles]
+    return role_ids
+
+
+class GuildRoleIndex:
+    """The role order and role permissions of a guild, precomputed for user info embeds"""
+    def __init__(self, guild: discord.Guild):
+        self.guild_id = guild.id
+        self.default_role_id = guild.default_role.id
+        self.default_permissions = guild.default_role.permissions.value
+        # Role ID -> rank, 0 being the highest role (roles sort by position, then ID)
+        ordered = sorted(guild.roles, reverse=True)
+        self.ranks = {role.id: rank for rank, role in enumerate(ordered)}
+        self.permissions = {role.id: role.permissions.value for role in ordered}
+
+    def sorted_roles(self, role_ids: Iterable[int]) -> list[int]:
+        """Returns the role IDs from the highest role to the lowest, without @everyone and unknown roles"""
+        ranks = self.ranks
+        return sorted((role_id for role_id in role_ids if role_id in ranks and role_id != self.default_role_id), key=ranks.__getitem__)
+
+    def permissions_for(self, member: discord.Member) -> int:
+        """Returns the member's guild permissions as a bitmask, like Member.guild_permissions"""
+        if member.id == member.guild.owner_id:
+            return ALL_PERMISSIONS
+
+        value = self.default_permissions
+        for role_id in member_role_ids(member):
+            value |= self.permissions.get(role_id, 0)
+
+        if value & ADMINISTRATOR:
+            return ALL_PERMISSIONS
+        if member.is_timed_out():
+            value &= TIMEOUT_MASK
+        return value
+
+    @staticmethod
+    def mod_permissions(value: int) -> list[str]:
+        """Returns the labels of the moderator permissions in a permissions bitmask"""
+        if not value & MOD_PERMISSIONS_MASK:
+            return []
+        return [label for flag, label in MOD_PERMISSION_LABELS if value & flag]
+
+
+class RoleIndexes:
+    """Lazily built role indexes of the guilds, dropped whenever a guild's roles change"""
+    def __init__(self, max_guilds: int = 1000):
+        self.indexes = LRUCache(max_size=max_guilds)
+
+    def get(self, guild: discord.Guild) -> GuildRoleIndex:
+        """Returns the guild's role index, building it if needed"""
+        index = self.indexes.get(guild.id)
+        if index is None:
+            index = GuildRoleIndex(guild)
+            self.indexes.set(guild.id, index)
+        return index
+
+    def invalidate(self, guild_id: int):
+        """Drops a guild's role index, it is rebuilt on the next lookup"""
+        self.indexes.pop(guild_id)
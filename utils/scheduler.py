@@ -0,0 +1,138 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, NamedTuple, Optional
+from utils.database import Database
+
+
+class ScheduledReminder(NamedTuple):
+    """A reminder waiting in the scheduler, ordered by when it is due"""
+    remind_at: int
+    id: int
+    user_id: int
+    reminder_about: str
+
+
+class ReminderScheduler:
+    """Keeps the next due reminders in a min-heap and sleeps exactly until the earliest one"""
+    def __init__(self, db: Database, callback: Callable[[list[ScheduledReminder]], Awaitable[None]], batch_size: int = 1000,
+                 poll_interval: Optional[float] = None):
+        self.db = db
+        self.callback = callback # Called with the reminders that are due
+        self.batch_size = batch_size # How many reminders are kept in memory at once
+        # Reload from the database at least this often, for reminders added by other processes that can't call add()
+        self.poll_interval = poll_interval
+        self._refilled_at = 0.0
+        self._heap: list[ScheduledReminder] = []
+        # Reminders due after the horizon are only in the database, None means every reminder is in memory
+        self.horizon: Optional[int] = None
+        self._stale = True # Whether the heap has to be reloaded from the database
+        # Changes made while a refill query is running, applied on top of its result
+        self._added_during_refill: Optional[list[ScheduledReminder]] = None
+        self._discarded_during_refill: Optional[list[Callable]] = None
+        self._wakeup = asyncio.Event()
+
+    async def refill(self):
+        """Loads the next batch of due reminders from the database"""
+        self._added_during_refill, self._discarded_during_refill = [], []
+        try:
+            rows = await self.db.fetchall(
+                "SELECT remind_at, id, user_id, reminder_about FROM reminders ORDER BY remind_at, id LIMIT ?", (self.batch_size, )
+            )
+            added, discarded = self._added_during_refill, self._discarded_during_refill
+        finally:
+            self._added_during_refill, self._discarded_during_refill = None, None
+
+        self._heap = [ScheduledReminder(*row) for row in rows]
+        self.horizon = rows[-1][0] if len(rows) >= self.batch_size else None
+        # Keep reminders that were added while the query was running
+        loaded_ids = {reminder.id for reminder in self._heap}
+        self._heap.extend(
+            reminder for reminder in added
+            if reminder.id not in loaded_ids and (self.horizon is None or reminder.remind_at < self.horizon)
+        )
+        for predicate in discarded:
+            self._heap = [reminder for reminder in self._heap if not predicate(reminder)]
+        heapq.heapify(self._heap)
+        self._stale = False
+
+    def add(self, reminder: ScheduledReminder):
+        """Schedules a new reminder and wakes the scheduler if it is due sooner"""
+        if self.horizon is not None and reminder.remind_at >= self.horizon:
+            return # It will be loaded from the database with a later batch
+
+        if self._added_during_refill is not None:
+            self._added_during_refill.append(reminder)
+
+        heapq.heappush(self._heap, reminder)
+        if len(self._heap) > self.batch_size * 2:
+            # Keep only the earliest batch in memory, the rest stays in the database
+            self._heap = heapq.nsmallest(self.batch_size, self._heap)
+            self.horizon = self._heap[-1].remind_at
+            heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def discard(self, predicate: Callable[[ScheduledReminder], bool]):
+        """Unschedules every reminder that matches the predicate"""
+        if self._discarded_during_refill is not None:
+            self._discarded_during_refill.append(predicate)
+
+        remaining = [reminder for reminder in self._heap if not predicate(reminder)]
+        if len(remaining) != len(self._heap):
+            heapq.heapify(remaining)
+            self._heap = remaining
+            self._wakeup.set()
+
+    def invalidate(self):
+        """Reloads the reminders from the database right away, for changes made by other processes"""
+        self._stale = True
+        self._wakeup.set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def overdue(self) -> int:
+        """Returns how many reminders in memory are due but not delivered yet"""
+        now = int(time.time())
+        return sum(1 for reminder in self._heap if reminder.remind_at <= now)
+
+    async def run(self):
+        """Delivers reminders as they become due until cancelled"""
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            try:
+                if self.poll_interval and time.monotonic() - self._refilled_at >= self.poll_interval:
+                    self._stale = True
+                # Load more reminders once the in-memory ones are used up
+                if self._stale or (not self._heap and self.horizon is not None):
+                    await self.refill()
+                    self._refilled_at = time.monotonic()
+
+                now = time.time()
+                if self._heap and self._heap[0].remind_at <= now:
+                    due = []
+                    while self._heap and self._heap[0].remind_at <= now:
+                        due.append(heapq.heappop(self._heap))
+                    await self.callback(due)
+                    continue
+
+                # Sleep until the earliest reminder is due, or forever if there are none
+                if self._heap:
+                    timeout = self._heap[0].remind_at - now
+                if self.poll_interval:
+                    timeout = min(timeout, self.poll_interval) if timeout is not None else self.poll_interval
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                logging.error(f"[Reminder Scheduler] Failed to process due reminders: {e}")
+                self._stale = True # Reload from the database so nothing is lost
+                timeout = 30 # Retry later
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,32 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time, concurrent callers of the same key share its result"""
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        # Call statistics
+        self.calls = 0 # Calls that actually ran
+        self.coalesced = 0 # Calls that waited on one already in flight
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the result of func(), or of the call already in flight for the key"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        # Shield the shared call so one caller being cancelled doesn't cancel it for everyone else
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        """Returns the call counters and how many calls are in flight"""
+        return {"calls": self.calls, "coalesced": self.coalesced, "inflight": len(self._inflight)}
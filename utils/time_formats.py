@@ -0,0 +1,153 @@
+import calendar
+import re
+from itertools import product
+from typing import NamedTuple, Optional
+
+# The absolute date and time formats accepted by /reminder remindme, in priority order
+DATE_FORMATS = [
+    # Year first
+    "%Y-%m-%d", "%Y/%m/%d", "%Y %m %d", # 2025-01-25, 2025/01/25, 2025 01 25
+    "%Y-%b-%d", "%Y/%b/%d", "%Y %b %d", # 2025-Jan-25, 2025/Jan/25, 2025 Jan 25
+    "%Y-%B-%d", "%Y/%B/%d", "%Y %B %d", # 2025-January-25, 2025/January/25, 2025 January 25
+    "%Y-%m", "%Y/%m", "%Y %m", # 2025-01, 2025/01, 2025 01
+    "%Y-%b", "%Y/%b", "%Y %b", # 2025-Jan, 2025/Jan, 2025 Jan
+    "%Y-%B", "%Y/%B", "%Y %B", # 2025-January, 2025/January, 2025 January
+    # Day first
+    "%d-%m-%Y", "%d/%m/%Y", "%d %m %Y", # 25-01-2025, 25/01/2025, 25 01 2025
+    "%d-%b-%Y", "%d/%b/%Y", "%d %b %Y", # 25-Jan-2025, 25/Jan/2025, 25 Jan 2025
+    "%d-%B-%Y", "%d/%B/%Y", "%d %B %Y", # 25-January-2025, 25/January/2025, 25 January 2025
+    "%d-%m", "%d/%m", "%d %m", # 25-01, 25/01, 25 01
+    "%d-%b", "%d/%b", "%d %b", # 25-Jan, 25/Jan, 25 Jan
+    "%d-%B", "%d/%B", "%d %B", # 25-January, 25/January, 25 January
+    "%a", "%A", # Wed, Wednesday
+    # Month first
+    "%m-%d", "%m/%d", "%m %d", # 01-25, 01/25, 01 25
+    "%b-%d", "%b/%d", "%b %d", # Jan-25, Jan/25, Jan 25
+    "%B-%d", "%B/%d", "%B %d", # January-25, January/25, January 25
+]
+TIME_FORMATS = [
+    "%I:%M %p", # 12:00 PM
+    "%I:%M%p", # 12:00PM
+    "%H:%M", # 12:00
+    "%I %p", # 12 PM
+    "%I%p" # 12PM
+]
+# Combined formats first, then date only and time only formats, the same order strptime used to try them in
+ALL_FORMATS = [f"{date} {time}" for date, time in product(DATE_FORMATS, TIME_FORMATS)] + DATE_FORMATS + TIME_FORMATS
+
+# English month and day names, matched case-insensitively like strptime does
+MONTH_ABBRS = {name: index for index, name in enumerate(("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+MONTH_NAMES = {name: index for index, name in enumerate(("january", "february", "march", "april", "may", "june", "july",
+                                                          "august", "september", "october", "november", "december"), 1)}
+DAY_ABBRS = {name: index for index, name in enumerate(("mon", "tue", "wed", "thu", "fri", "sat", "sun"))}
+DAY_NAMES = {name: index for index, name in enumerate(("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"))}
+
+# Numeric directives and their (min, max) values
+NUMBER_RANGES = {"Y": (1, 9999), "m": (1, 12), "d": (1, 31), "H": (0, 23), "I": (1, 12), "M": (0, 59)}
+NAME_TABLES = {"b": MONTH_ABBRS, "B": MONTH_NAMES, "a": DAY_ABBRS, "A": DAY_NAMES, "p": {"am": 0, "pm": 12}}
+
+# Splits user input into numbers, words, whitespace and separators. Like strptime's %d, a single digit padded with one
+# space (" 9") is a number at the start or after a separator; after whitespace the padding is part of the whitespace anyway
+_TOKEN_RE = re.compile(r"(?:^|(?<=[-/:])) [1-9](?!\d)|\d+|[a-z]+|\s+|[-/:]")
+_SPACE_PADDED = {"d"} # The only directive strptime accepts space padding for
+_FORMAT_RE = re.compile(r"%[a-zA-Z]|\s+|[^%\s]") # Splits a format into directives, whitespace and separators
+
+
+class ParsedTime(NamedTuple):
+    """The components of a time string matched by one of the absolute formats"""
+    format: str
+    year: Optional[int]
+    month: Optional[int]
+    day: Optional[int]
+    weekday: Optional[int] # 0 is Monday
+    hour: int
+    minute: int
+
+    @property
+    def is_time_only(self) -> bool:
+        return self.month is None and self.weekday is None
+
+
+def _token_kind(token: str) -> str:
+    """Classifies a token of user input or a piece of a format"""
+    if token.lstrip(" ").isdigit():
+        return "number"
+    if token.isalpha():
+        return "word"
+    if token.isspace():
+        return " "
+    return token
+
+
+def _compile_formats() -> dict:
+    """Builds a table from the shape of a format (its token kinds) to the formats with that shape"""
+    table = {}
+    for fmt in ALL_FORMATS:
+        shape, directives = [], []
+        for piece in _FORMAT_RE.findall(fmt):
+            if piece.startswith("%"):
+                shape.append("number" if piece[1] in NUMBER_RANGES else "word")
+                directives.append(piece[1])
+            else:
+                shape.append(_token_kind(piece))
+                directives.append(None)
+        table.setdefault(tuple(shape), []).append((fmt, tuple(directives)))
+    return table
+
+FORMAT_TABLE = _compile_formats()
+
+
+def _match(fmt: str, directives: tuple, tokens: list) -> Optional[ParsedTime]:
+    """Checks the tokens against a format of the same shape and returns the parsed components"""
+    values = {}
+    for directive, token in zip(directives, tokens):
+        if directive is None:
+            continue
+        if directive in NUMBER_RANGES:
+            low, high = NUMBER_RANGES[directive]
+            # The year needs exactly 4 digits, the others 1 or 2
+            if (len(token) != 4) if directive == "Y" else (len(token) > 2):
+                return None
+            if token[0] == " " and directive not in _SPACE_PADDED:
+                return None
+            value = int(token)
+            if not low <= value <= high:
+                return None
+        else:
+            value = NAME_TABLES[directive].get(token)
+            if value is None:
+                return None
+        values[directive] = value
+
+    year = values.get("Y")
+    month = values.get("m", values.get("b", values.get("B")))
+    day = values.get("d")
+    if month is not None and day is not None:
+        # A leap year is assumed when there is no year, the caller checks the final date
+        if day > calendar.monthrange(year or 2000, month)[1]:
+            return None
+
+    hour = values.get("H", 0)
+    if "I" in values:
+        hour = values["I"] % 12 + values.get("p", 0)
+
+    return ParsedTime(fmt, year, month, day, values.get("a", values.get("A")), hour, values.get("M", 0))
+
+
+def parse_time_format(remind_at: str) -> Optional[ParsedTime]:
+    """Parses an absolute date/time string in one pass, returns None if it matches none of the formats"""
+    text = remind_at.lower()
+    tokens = _TOKEN_RE.findall(text)
+    if "".join(tokens) != text:
+        return None # The input has characters none of the formats accept
+
+    candidates = FORMAT_TABLE.get(tuple(_token_kind(token) for token in tokens))
+    if not candidates:
+        return None
+
+    # Most shapes have a single format, ambiguous ones (like 05-06) are tried in priority order
+    for fmt, directives in candidates:
+        parsed = _match(fmt, directives, tokens)
+        if parsed:
+            return parsed
+    return None
@@ -0,0 +1,61 @@
+import pytz
+from typing import Iterable
+
+_TZINFOS = {} # Zone name -> the shared tzinfo object for it
+
+
+def get_timezone(name: str) -> pytz.BaseTzInfo:
+    """Returns one shared tzinfo object per zone name, raises UnknownTimeZoneError for invalid names"""
+    tzinfo = _TZINFOS.get(name)
+    if tzinfo is None:
+        tzinfo = _TZINFOS[name] = pytz.timezone(name)
+    return tzinfo
+
+class TimezoneIndex:
+    """A prebuilt search index over timezone names for fast autocomplete"""
+    def __init__(self, timezones: Iterable[str] = pytz.all_timezones, common: Iterable[str] = pytz.common_timezones):
+        common = set(common)
+        # Common zones rank before legacy aliases, then shorter and alphabetical names first
+        self.timezones = sorted(timezones, key=lambda tz: (tz not in common, len(tz), tz))
+        self._lowered = [tz.lower() for tz in self.timezones]
+        self._exact = {name: rank for rank, name in enumerate(self._lowered)}
+        self._name_prefixes = {} # Prefix of the full name -> ranks of the zones
+        self._segment_prefixes = {} # Prefix of a region or city (e.g. 'cairo' in 'africa/cairo') -> ranks of the zones
+
+        for rank, name in enumerate(self._lowered):
+            for end in range(1, len(name) + 1):
+                self._name_prefixes.setdefault(name[:end], []).append(rank)
+
+            segments = set(name.split("/")[1:])
+            segments.update(part for segment in list(segments) for part in segment.split("_")[1:])
+            prefixes = {segment[:end] for segment in segments for end in range(1, len(segment) + 1)}
+            for prefix in prefixes:
+                self._segment_prefixes.setdefault(prefix, []).append(rank)
+
+    def search(self, query: str, limit: int = 25) -> list[str]:
+        """Returns the best matching timezones: exact, then name prefix, then region/city prefix, then substring"""
+        query = query.strip().lower().replace(" ", "_")
+        if not query:
+            return self.timezones[:limit]
+
+        results = []
+        seen = set()
+
+        def extend(ranks):
+            for rank in ranks:
+                if rank not in seen:
+                    seen.add(rank)
+                    results.append(rank)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        exact = self._exact.get(query)
+        if (extend([exact] if exact is not None else [])
+                or extend(self._name_prefixes.get(query, ()))
+                or extend(self._segment_prefixes.get(query, ()))):
+            return [self.timezones[rank] for rank in results]
+
+        # Fall back to a substring scan only when the prefix indexes didn't fill the list
+        extend(rank for rank, name in enumerate(self._lowered) if query in name)
+        return [self.timezones[rank] for rank in results]
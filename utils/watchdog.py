@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import NamedTuple, Optional
+from utils.metrics import Histogram
+
+# Frames in these files are the bot's own code, the rest is the standard library and dependencies
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LagReport(NamedTuple):
+    """A stall of the event loop and what it was running at the time"""
+    at: float # Unix time the stall was noticed
+    duration: float # How long the loop was blocked, in seconds
+    location: str # The innermost frame of the bot's own code, e.g. cogs/reminder.py:120 in remindme
+    cog: Optional[str]
+    command: Optional[str]
+    stack: str
+
+
+def _attribute(frame) -> tuple[str, Optional[str], Optional[str], str]:
+    """Returns the location, cog, command and formatted stack of a frame of the blocked thread"""
+    stack = traceback.extract_stack(frame)
+    location, cog, command = "unknown", None, None
+    for summary in reversed(stack):
+        path = os.path.abspath(summary.filename)
+        if path.startswith(PROJECT_ROOT + os.sep):
+            relative = os.path.relpath(path, PROJECT_ROOT)
+            location = f"{relative}:{summary.lineno} in {summary.name}"
+            if relative.startswith("cogs" + os.sep):
+                cog = os.path.splitext(os.path.basename(relative))[0]
+            break
+
+    # Find the command being run from the ctx/interaction of the frames, innermost first
+    while frame is not None and command is None:
+        try:
+            for name in ("ctx", "interaction"):
+                value = frame.f_locals.get(name)
+                qualified_name = getattr(getattr(value, "command", None), "qualified_name", None)
+                if qualified_name:
+                    command = qualified_name
+                    break
+        except Exception:
+            pass # The frame changed under us, the attribution is best effort
+        frame = frame.f_back
+
+    return location, cog, command, "".join(traceback.format_list(stack))
+
+
+class LoopWatchdog:
+    """Measures event loop lag, and captures what the loop was running when it stalls"""
+    # A task on the loop records a heartbeat every interval; a separate thread watches the heartbeat,
+    # so it can look at the loop thread's stack while the loop is still blocked
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1, histogram: Optional[Histogram] = None, max_reports: int = 50):
+        self.threshold = threshold # Stalls longer than this are reported
+        self.interval = interval
+        self.lag = histogram or Histogram() # How late the loop wakes up from each heartbeat sleep
+        self.reports: deque[LagReport] = deque(maxlen=max_reports)
+        self.stalls = 0
+        self._beat = time.monotonic()
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Starts the heartbeat task on the running loop and the watching thread"""
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._beat = time.monotonic()
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag.observe(max(0.0, loop.time() - start - self.interval))
+
+    def _watch(self):
+        pending = None # (heartbeat, noticed at, frame attribution) of the stall in progress
+        while not self._stop.wait(self.interval / 2):
+            beat = self._beat
+            blocked = time.monotonic() - beat
+            if pending is not None and pending[0] != beat:
+                # The loop is running again, report the stall with its full duration
+                self._report(pending, beat - pending[0] - self.interval)
+                pending = None
+
+            if pending is None and blocked > self.threshold + self.interval:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    pending = (beat, time.time(), _attribute(frame))
+
+    def _report(self, pending: tuple, duration: float):
+        _, at, (location, cog, command, stack) = pending
+        report = LagReport(at, duration, location, cog, command, stack)
+        self.reports.append(report)
+        self.stalls += 1
+        logging.warning(
+            f"[Watchdog] Event loop blocked for {duration * 1000:.0f}ms at {location}"
+            f"{f' (cog: {cog})' if cog else ''}{f' (command: {command})' if command else ''}\n{stack}"
+        )